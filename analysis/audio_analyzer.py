@@ -1,130 +1,254 @@
+import hashlib
+import json
+import os
+import tempfile
 import librosa
 import numpy as np
-from typing import Dict, List, Tuple
+import soundfile as sf
+from typing import Any, Dict, Tuple
 from pathlib import Path
 from scipy.signal import find_peaks
 
+from config.settings import load_settings
 from utils.logger import setup_logger
+from utils.helpers import to_records
+
+# Bump when the analysis output changes so stale cache files are ignored
+_RHYTHM_CACHE_VERSION = 3
+
+# 5-tap binomial smoothing kernel used before emphasis peak picking
+_SMOOTHING_KERNEL = np.array([1, 4, 6, 4, 1], dtype=np.float32) / 16
+
+def rhythm_map_to_records(rhythm_map: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a column-oriented rhythm map into plain JSON-serializable records"""
+    
+    records = {}
+    for key, value in rhythm_map.items():
+        if isinstance(value, np.ndarray):
+            records[key] = value.tolist()
+        elif isinstance(value, dict) and value and all(isinstance(v, np.ndarray) for v in value.values()):
+            records[key] = to_records(value)
+        else:
+            records[key] = value
+    
+    return records
 
 class AudioAnalyzer:
     """Analyzes audio for rhythm and timing information"""
     
     def __init__(self):
+        self.settings = load_settings()
         self.logger = setup_logger("audio_analyzer")
     
     def create_rhythm_map(self, audio_path: Path) -> Dict[str, any]:
-        """Create comprehensive rhythm and timing analysis"""
+        """Create comprehensive rhythm and timing analysis
+        
+        Per-event features (beats, speech_segments, emphasis_points,
+        natural_breaks, energy_profile) are stored column-wise as float32
+        arrays, e.g. ``rhythm_map["natural_breaks"]["start"]``. Use
+        ``rhythm_map_to_records`` to get the list-of-dicts JSON form.
+        """
         
         self.logger.info(f"Analyzing audio rhythm: {audio_path}")
         
         try:
+            # Reuse a previous analysis of byte-identical audio
+            cache_path = self._rhythm_cache_path(audio_path)
+            if cache_path.exists():
+                try:
+                    rhythm_map = self._load_rhythm_map(cache_path)
+                    self.logger.info(f"Loaded cached rhythm analysis: {cache_path}")
+                    return rhythm_map
+                except Exception as e:
+                    # A damaged cache file is a miss; drop it so it is rebuilt below
+                    self.logger.warning(f"Discarding unreadable rhythm cache {cache_path}: {e}")
+                    cache_path.unlink(missing_ok=True)
+            
             # Load audio file
-            y, sr = librosa.load(str(audio_path))
+            y, sr = self._load_audio(audio_path)
             duration = librosa.get_duration(y=y, sr=sr)
             
             # Extract rhythm features
             tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
+            beat_times = (beats * (512 / sr)).astype(np.float32)  # Convert frames to seconds
             
             # Convert numpy values to Python scalars for safe formatting
             tempo_scalar = float(tempo) if hasattr(tempo, 'item') else tempo
             duration_scalar = float(duration) if hasattr(duration, 'item') else duration
             
-            # Detect speech segments vs silence
-            intervals = librosa.effects.split(y, top_db=20)
+            # Single magnitude STFT shared by every frame-level feature below
+            S = np.abs(librosa.stft(y, n_fft=2048, hop_length=512)).astype(np.float32, copy=False)
             
             # Analyze energy and emphasis
-            rms = librosa.feature.rms(y=y, frame_length=2048, hop_length=512)[0]
+            rms = librosa.feature.rms(S=S, frame_length=2048, hop_length=512)[0].astype(np.float32, copy=False)
             emphasis_points = self._find_emphasis_points(rms, sr)
             
-            # Detect natural pauses
-            natural_breaks = self._find_natural_breaks(y, sr)
+            # Detect speech segments vs silence, and (more sensitively) natural
+            # pauses, from the same RMS frames instead of two effects.split passes
+            rms_db = librosa.amplitude_to_db(rms, ref=np.max)
+            intervals = self._nonsilent_intervals(rms_db, 20, len(y))
+            natural_breaks = self._find_natural_breaks(self._nonsilent_intervals(rms_db, 25, len(y)), sr)
             
             # Analyze spectral features for emotional content
-            spectral_features = self._analyze_spectral_features(y, sr)
+            spectral_features = self._analyze_spectral_features(S, y, sr)
             
             # Create comprehensive rhythm map
             rhythm_map = {
                 "duration": duration_scalar,
                 "tempo": tempo_scalar,
-                "beats": [float(beat * 512 / sr) for beat in beats],  # Convert to seconds
-                "speech_segments": [
-                    {
-                        "start": float(interval[0] / sr),
-                        "end": float(interval[1] / sr),
-                        "duration": float((interval[1] - interval[0]) / sr)
-                    }
-                    for interval in intervals
-                ],
+                "beats": beat_times,
+                "speech_segments": {
+                    "start": (intervals[:, 0] / sr).astype(np.float32),
+                    "end": (intervals[:, 1] / sr).astype(np.float32),
+                    "duration": ((intervals[:, 1] - intervals[:, 0]) / sr).astype(np.float32)
+                },
                 "emphasis_points": emphasis_points,
                 "natural_breaks": natural_breaks,
                 "spectral_features": spectral_features,
                 "energy_profile": self._create_energy_profile(rms, sr),
-                "pacing_recommendations": self._generate_pacing_recommendations(rms, beats, natural_breaks, sr)
+                "pacing_recommendations": self._generate_pacing_recommendations(rms, beat_times, natural_breaks)
             }
             
             self.logger.info(f"Rhythm analysis complete - Duration: {duration_scalar:.2f}s, Tempo: {tempo_scalar:.1f} BPM")
+            self._save_rhythm_map(rhythm_map, cache_path)
             return rhythm_map
             
         except Exception as e:
             self.logger.error(f"Error analyzing audio rhythm: {e}")
             raise
     
-    def _find_emphasis_points(self, rms: np.ndarray, sr: int) -> List[Dict[str, float]]:
+    def _rhythm_cache_path(self, audio_path: Path) -> Path:
+        """Cache file for an audio file, keyed by a hash of its contents"""
+        
+        digest = hashlib.blake2b(digest_size=16)
+        with open(audio_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        
+        return self.settings.cache_dir / "rhythm" / f"rhythm_v{_RHYTHM_CACHE_VERSION}_{digest.hexdigest()}.npz"
+    
+    def _save_rhythm_map(self, rhythm_map: Dict[str, Any], cache_path: Path) -> None:
+        """Persist a rhythm map as compressed npz (columns as arrays, the rest as JSON)"""
+        
+        arrays = {}
+        meta = {}
+        for key, value in rhythm_map.items():
+            if isinstance(value, np.ndarray):
+                arrays[key] = value
+            elif isinstance(value, dict) and value and all(isinstance(v, np.ndarray) for v in value.values()):
+                for field, column in value.items():
+                    arrays[f"{key}/{field}"] = column
+            else:
+                meta[key] = value
+        
+        temp_path = None
+        try:
+            # Write beside the target and rename, so a crash never leaves a truncated cache file
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=cache_path.parent, suffix=".part", delete=False) as temp_file:
+                temp_path = temp_file.name
+                np.savez_compressed(temp_file, __meta__=np.array(json.dumps(meta)), **arrays)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            if temp_path is not None:
+                Path(temp_path).unlink(missing_ok=True)
+            # Caching is best-effort; the analysis result is still valid
+            self.logger.warning(f"Could not cache rhythm analysis: {e}")
+    
+    def _load_rhythm_map(self, cache_path: Path) -> Dict[str, Any]:
+        """Load a rhythm map written by _save_rhythm_map"""
+        
+        with np.load(cache_path) as data:
+            rhythm_map = json.loads(data["__meta__"].item())
+            for name in data.files:
+                if name == "__meta__":
+                    continue
+                key, _, field = name.partition("/")
+                if field:
+                    rhythm_map.setdefault(key, {})[field] = data[name]
+                else:
+                    rhythm_map[key] = data[name]
+        
+        return rhythm_map
+    
+    def _load_audio(self, audio_path: Path) -> Tuple[np.ndarray, int]:
+        """Load audio as mono float32 at its native sample rate"""
+        
+        try:
+            # Direct decode avoids librosa's resample pass to 22050 Hz
+            y, sr = sf.read(str(audio_path), dtype='float32', always_2d=False)
+        except sf.LibsndfileError as e:
+            # Formats libsndfile cannot decode still go through librosa/audioread
+            self.logger.warning(f"soundfile could not read {audio_path} ({e}), falling back to librosa")
+            return librosa.load(str(audio_path), sr=None, mono=True)
+        
+        if y.ndim > 1:
+            y = y.mean(axis=1)
+        
+        return y, sr
+    
+    def _find_emphasis_points(self, rms: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
         """Find moments of vocal emphasis based on energy peaks"""
         
         # Smooth RMS for better peak detection
-        from scipy.ndimage import gaussian_filter1d
-        smoothed_rms = gaussian_filter1d(rms, sigma=2)
+        smoothed_rms = np.convolve(rms, _SMOOTHING_KERNEL, mode='same')
         
         # Find peaks above mean + standard deviation
         threshold = np.mean(smoothed_rms) + 0.7 * np.std(smoothed_rms)
         peaks, properties = find_peaks(smoothed_rms, height=threshold, distance=int(0.5 * sr / 512))
         
-        emphasis_points = []
-        for peak in peaks:
-            timestamp = float(peak * 512 / sr)  # Convert frame to seconds
-            intensity = float(smoothed_rms[peak])
-            
-            emphasis_points.append({
-                "timestamp": timestamp,
-                "intensity": intensity,
-                "type": "vocal_emphasis"
-            })
+        return {
+            "timestamp": (peaks * (512 / sr)).astype(np.float32),  # Convert frames to seconds
+            "intensity": properties["peak_heights"].astype(np.float32)
+        }
+    
+    def _nonsilent_intervals(self, rms_db: np.ndarray, top_db: float, n_samples: int) -> np.ndarray:
+        """Sample intervals louder than ``top_db`` below the peak
+        
+        Equivalent to ``librosa.effects.split`` with frame_length=2048 and
+        hop_length=512, but reuses RMS frames that were already computed.
+        """
         
-        return emphasis_points
+        non_silent = rms_db > -top_db
+        if not non_silent.any():
+            return np.empty((0, 2), dtype=np.int64)
+        
+        edges = np.flatnonzero(np.diff(non_silent.astype(np.int8))) + 1
+        if non_silent[0]:
+            edges = np.insert(edges, 0, 0)
+        if non_silent[-1]:
+            edges = np.append(edges, len(non_silent))
+        
+        # Frames to samples, clipped to the signal length
+        return np.minimum(edges * 512, n_samples).reshape(-1, 2)
     
-    def _find_natural_breaks(self, y: np.ndarray, sr: int) -> List[Dict[str, float]]:
-        """Find natural pauses and breaks in speech"""
+    def _find_natural_breaks(self, intervals: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
+        """Find natural pauses and breaks in speech from non-silent intervals"""
         
-        # More sensitive silence detection for breaks
-        intervals = librosa.effects.split(y, top_db=25, frame_length=2048, hop_length=512)
+        # Gaps between consecutive voiced intervals
+        starts = intervals[:-1, 1] / sr
+        ends = intervals[1:, 0] / sr
+        durations = ends - starts
         
-        breaks = []
-        for i in range(len(intervals) - 1):
-            break_start = float(intervals[i][1] / sr)
-            break_end = float(intervals[i + 1][0] / sr)
-            break_duration = break_end - break_start
-            
-            # Only consider significant pauses
-            if break_duration > 0.2:  # 200ms minimum
-                break_type = "short" if break_duration < 1.0 else "long"
-                
-                breaks.append({
-                    "start": break_start,
-                    "end": break_end,
-                    "duration": break_duration,
-                    "type": break_type
-                })
-        
-        return breaks
+        # Only consider significant pauses
+        mask = durations > 0.2  # 200ms minimum
+        durations = durations[mask]
+        
+        return {
+            "start": starts[mask].astype(np.float32),
+            "end": ends[mask].astype(np.float32),
+            "duration": durations.astype(np.float32),
+            "type": np.where(durations < 1.0, "short", "long")
+        }
     
-    def _analyze_spectral_features(self, y: np.ndarray, sr: int) -> Dict[str, float]:
+    def _analyze_spectral_features(self, S: np.ndarray, y: np.ndarray, sr: int) -> Dict[str, float]:
         """Analyze spectral features for emotional content"""
         
-        # Extract spectral features
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-        zero_crossing_rate = librosa.feature.zero_crossing_rate(y)[0]
+        # Extract spectral features from the precomputed magnitude spectrogram
+        # float32 is plenty for these averages and halves memory traffic
+        spectral_centroids = librosa.feature.spectral_centroid(S=S, sr=sr)[0].astype(np.float32, copy=False)
+        spectral_rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr)[0].astype(np.float32, copy=False)
+        zero_crossing_rate = librosa.feature.zero_crossing_rate(y)[0].astype(np.float32, copy=False)
         
         return {
             "avg_spectral_centroid": float(np.mean(spectral_centroids)),
@@ -133,30 +257,27 @@ class AudioAnalyzer:
             "spectral_variance": float(np.var(spectral_centroids))
         }
     
-    def _create_energy_profile(self, rms: np.ndarray, sr: int) -> List[Dict[str, float]]:
+    def _create_energy_profile(self, rms: np.ndarray, sr: int) -> Dict[str, np.ndarray]:
         """Create energy profile over time for visual pacing"""
         
         # Sample energy at regular intervals (every 0.5 seconds)
         sample_rate = 0.5  # seconds
         samples_per_interval = int(sample_rate * sr / 512)  # frames per interval
         
-        energy_profile = []
         rms_max = float(np.max(rms))  # Convert to scalar
         
-        for i in range(0, len(rms), samples_per_interval):
-            end_idx = min(i + samples_per_interval, len(rms))
-            interval_energy = np.mean(rms[i:end_idx])
-            timestamp = float(i * 512 / sr)
-            
-            energy_profile.append({
-                "timestamp": timestamp,
-                "energy": float(interval_energy),
-                "relative_energy": float(interval_energy / rms_max)  # Normalized 0-1
-            })
+        # Mean energy of every interval in one vectorized pass
+        starts = np.arange(0, len(rms), samples_per_interval)
+        counts = np.diff(np.append(starts, len(rms)))
+        energies = np.add.reduceat(rms, starts) / counts
         
-        return energy_profile
+        return {
+            "timestamp": (starts * (512 / sr)).astype(np.float32),
+            "energy": energies.astype(np.float32),
+            "relative_energy": (energies / rms_max).astype(np.float32)  # Normalized 0-1
+        }
     
-    def _generate_pacing_recommendations(self, rms: np.ndarray, beats: np.ndarray, natural_breaks: List[Dict], sr: int) -> Dict[str, any]:
+    def _generate_pacing_recommendations(self, rms: np.ndarray, beat_times: np.ndarray, natural_breaks: Dict[str, np.ndarray]) -> Dict[str, any]:
         """Generate intelligent pacing recommendations for video editing"""
         
         avg_energy = float(np.mean(rms))
@@ -170,26 +291,17 @@ class AudioAnalyzer:
         else:
             pacing_style = "steady"  # Stable energy
         
-        # Recommend cut points based on beats and breaks
-        recommended_cuts = []
-        
-        # Add cuts at natural breaks
-        for break_info in natural_breaks:
-            if break_info["duration"] > 0.5:  # Significant breaks
-                recommended_cuts.append({
-                    "timestamp": break_info["start"],
-                    "type": "natural_break",
-                    "confidence": 0.9
-                })
-        
-        # Add cuts at strong beats (for rhythmic editing)
-        beat_timestamps = beats * 512 / sr
-        for beat_time in beat_timestamps[::4]:  # Every 4th beat
-            recommended_cuts.append({
-                "timestamp": float(beat_time),
-                "type": "rhythmic",
-                "confidence": 0.6
-            })
+        # Recommend cut points at significant natural breaks, then at
+        # strong beats (every 4th beat, for rhythmic editing)
+        significant = natural_breaks["duration"] > 0.5
+        recommended_cuts = [
+            {"timestamp": timestamp, "type": "natural_break", "confidence": 0.9}
+            for timestamp in natural_breaks["start"][significant].tolist()
+        ]
+        recommended_cuts.extend(
+            {"timestamp": timestamp, "type": "rhythmic", "confidence": 0.6}
+            for timestamp in beat_times[::4].tolist()
+        )
         
         return {
             "pacing_style": pacing_style,
@@ -1,14 +1,28 @@
 import requests
 import json
+import orjson
 import time
-from typing import Dict, List, Any
+import types
+from typing import Dict, List, Any, Mapping
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from config.settings import load_settings
 from utils.logger import setup_logger
 from utils.helpers import retry_with_backoff
 from director.production_plan import ProductionPlan
 
+# Transition effects per scene mood (read-only, shared across calls)
+_TRANSITION_MAP = types.MappingProxyType({
+    "energetic": {"fade_in": 0.2, "fade_out": 0.2},
+    "dramatic": {"fade_in": 0.8, "fade_out": 0.8},
+    "calm": {"fade_in": 1.0, "fade_out": 1.0},
+    "mysterious": {"fade_in": 1.5, "fade_out": 1.5},
+    "upbeat": {"fade_in": 0.1, "fade_out": 0.1}
+})
+_DEFAULT_TRANSITION = types.MappingProxyType({"fade_in": 0.5, "fade_out": 0.5})
+
 class VideoAssembler:
     """Handles final video assembly using Creatomate API"""
     
@@ -18,6 +32,16 @@ class VideoAssembler:
         self.api_key = self.settings.api.creatomate_api_key
         self.base_url = "https://api.creatomate.com/v1"
         
+        # Pooled keep-alive session so render polling reuses one TLS connection
+        self.session = requests.Session()
+        self.session.headers.update({"Authorization": f"Bearer {self.api_key}"})
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=8,
+            max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+        )
+        self.session.mount("https://", adapter)
+        
     @retry_with_backoff(max_retries=3)
     def assemble_final_video(self, production_plan: ProductionPlan, media_assets: Dict[str, Dict[str, str]]) -> str:
         """Assemble final video using all generated assets"""
@@ -70,24 +94,22 @@ class VideoAssembler:
                 "fade_out": 2.0
             })
         
-        # Add video scenes
-        for scene in production_plan.scenes:
-            if scene.id in media_assets.get("videos", {}):
-                video_element = {
-                    "type": "video",
-                    "source": media_assets["videos"][scene.id],
-                    "start_time": scene.start_time,
-                    "duration": scene.end_time - scene.start_time,
-                    "width": 1920,
-                    "height": 1080,
-                    "fit": "cover"
-                }
-                
-                # Add transitions based on scene mood
-                if hasattr(scene, 'mood'):
-                    video_element.update(self._get_transition_for_mood(scene.mood))
-                
-                composition["elements"].append(video_element)
+        # Add video scenes, with transitions based on scene mood
+        videos = media_assets.get("videos", {})
+        composition["elements"].extend(
+            {
+                "type": "video",
+                "source": videos[scene.id],
+                "start_time": scene.start_time,
+                "duration": scene.end_time - scene.start_time,
+                "width": 1920,
+                "height": 1080,
+                "fit": "cover",
+                **self._get_transition_for_mood(scene.mood)
+            }
+            for scene in production_plan.scenes
+            if scene.id in videos
+        )
         
         # Add title overlay if specified
         if production_plan.title:
@@ -110,28 +132,18 @@ class VideoAssembler:
         
         return {"composition": composition}
     
-    def _get_transition_for_mood(self, mood: str) -> Dict[str, Any]:
-        """Get appropriate transition effects based on scene mood"""
-        
-        transition_map = {
-            "energetic": {"fade_in": 0.2, "fade_out": 0.2},
-            "dramatic": {"fade_in": 0.8, "fade_out": 0.8},
-            "calm": {"fade_in": 1.0, "fade_out": 1.0},
-            "mysterious": {"fade_in": 1.5, "fade_out": 1.5},
-            "upbeat": {"fade_in": 0.1, "fade_out": 0.1}
-        }
+    def _get_transition_for_mood(self, mood: str) -> Mapping[str, Any]:
+        """Get appropriate transition effects based on scene mood
         
-        return transition_map.get(mood, {"fade_in": 0.5, "fade_out": 0.5})
+        Returns a shared mapping; callers copy it into their own element dict.
+        """
+        
+        return _TRANSITION_MAP.get(mood, _DEFAULT_TRANSITION)
     
     @retry_with_backoff(max_retries=3)
     def _submit_render_job(self, edl: Dict[str, Any]) -> str:
         """Submit render job to Creatomate"""
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
         payload = {
             "composition": edl["composition"],
             "output_format": "mp4",
@@ -140,10 +152,10 @@ class VideoAssembler:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/renders",
-                headers=headers,
-                json=payload,
+                headers={"Content-Type": "application/json"},
+                data=orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY),
                 timeout=30
             )
             
@@ -156,20 +168,21 @@ class VideoAssembler:
             self.logger.error(f"Error submitting render job: {e}")
             raise
     
-    def _wait_for_render_completion(self, render_id: str, max_wait_time: int = 600) -> str:
-        """Wait for render completion and return final video URL"""
+    def _wait_for_render_completion(self, render_id: str, max_wait_time: int = 600,
+                                    max_poll_interval: float = 10.0) -> str:
+        """Wait for render completion and return final video URL
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}"
-        }
+        Polls with exponential backoff (1s, 2s, 4s, 8s, then every
+        ``max_poll_interval`` seconds) so short renders return quickly.
+        """
         
         start_time = time.time()
+        poll_interval = 1.0
         
         while time.time() - start_time < max_wait_time:
             try:
-                response = requests.get(
+                response = self.session.get(
                     f"{self.base_url}/renders/{render_id}",
-                    headers=headers,
                     timeout=10
                 )
                 
@@ -185,11 +198,12 @@ class VideoAssembler:
                     raise Exception(f"Render failed: {error_msg}")
                 
                 # Still processing, wait and retry
-                self.logger.info(f"Render status: {status}, waiting...")
-                time.sleep(10)
+                self.logger.info(f"Render status: {status}, next check in {poll_interval:.0f}s")
                 
             except requests.exceptions.RequestException as e:
                 self.logger.error(f"Error checking render status: {e}")
-                time.sleep(5)
+            
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, max_poll_interval)
         
         raise TimeoutError(f"Render did not complete within {max_wait_time} seconds")
\ No newline at end of file
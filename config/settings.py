@@ -1,4 +1,5 @@
 import os
+import functools
 from pathlib import Path
 from dotenv import load_dotenv
 from dataclasses import dataclass
@@ -21,6 +22,8 @@ class StorageConfig:
     gcp_project: str
     gcp_bucket: str
     gcp_credentials: str
+    url_mode: str = "acl"  # "acl": per-object public ACL; "public": bucket IAM grants allUsers objectViewer; "signed": V4 signed URLs
+    signed_url_ttl: float = 7 * 24 * 3600  # V4 maximum
 
 @dataclass
 class VideoConfig:
@@ -29,18 +32,35 @@ class VideoConfig:
     max_duration: int = 600  # 10 minutes max
     quality: str = "high"
 
+@dataclass
+class LLMConfig:
+    plan_model: str = "llama-3.3-70b-versatile"
+    refinement_model: str = "llama-3.1-8b-instant"  # Timing-only JSON; falls back to plan_model
+
 @dataclass
 class Settings:
     api: APIConfig
     storage: StorageConfig
     video: VideoConfig
+    llm: LLMConfig
     debug: bool = False
     max_retries: int = 3
+    max_concurrency: int = 4
+    scene_timeout: float = 900.0  # End-to-end budget per generated scene, retries included
+    race_image_to_video: bool = False  # Submit Kling and Veo 2 together; doubles spend per scene
+    deterministic: bool = False  # Temperature 0 LLM calls, served from the reply cache on repeats
+    plan_cache_ttl: float = 0.0  # Seconds a production plan is reused for an identical brief; 0 disables
     temp_dir: Path = Path("temp")
     output_dir: Path = Path("output")
+    cache_dir: Path = Path("cache")
 
+@functools.lru_cache(maxsize=1)
 def load_settings() -> Settings:
-    """Load configuration from environment variables"""
+    """Load configuration from environment variables
+
+    The result is memoized so every component shares one Settings instance.
+    Call ``load_settings.cache_clear()`` to force a re-read (e.g. in tests).
+    """
     
     api_config = APIConfig(
         groq_api_key=os.getenv("GROQ_API_KEY", ""),
@@ -54,7 +74,9 @@ def load_settings() -> Settings:
     storage_config = StorageConfig(
         gcp_project=os.getenv("GOOGLE_CLOUD_PROJECT", ""),
         gcp_bucket=os.getenv("GOOGLE_CLOUD_BUCKET", ""),
-        gcp_credentials=os.getenv("GOOGLE_APPLICATION_CREDENTIALS", "")
+        gcp_credentials=os.getenv("GOOGLE_APPLICATION_CREDENTIALS", ""),
+        url_mode=os.getenv("GCS_URL_MODE", "acl"),
+        signed_url_ttl=float(os.getenv("GCS_SIGNED_URL_TTL", str(7 * 24 * 3600)))
     )
     
     video_config = VideoConfig(
@@ -62,10 +84,22 @@ def load_settings() -> Settings:
         fps=int(os.getenv("DEFAULT_VIDEO_FPS", "30"))
     )
     
+    llm_config = LLMConfig(
+        plan_model=os.getenv("LLM_PLAN_MODEL", "llama-3.3-70b-versatile"),
+        refinement_model=os.getenv("LLM_REFINEMENT_MODEL", "llama-3.1-8b-instant")
+    )
+    
     return Settings(
         api=api_config,
         storage=storage_config,
         video=video_config,
+        llm=llm_config,
         debug=os.getenv("DEBUG", "False").lower() == "true",
-        max_retries=int(os.getenv("MAX_RETRIES", "3"))
+        max_retries=int(os.getenv("MAX_RETRIES", "3")),
+        max_concurrency=int(os.getenv("MAX_CONCURRENCY", "4")),
+        scene_timeout=float(os.getenv("SCENE_TIMEOUT", "900")),
+        race_image_to_video=os.getenv("RACE_IMAGE_TO_VIDEO", "False").lower() == "true",
+        deterministic=os.getenv("DETERMINISTIC", "False").lower() == "true",
+        plan_cache_ttl=float(os.getenv("PLAN_CACHE_TTL", "0")),
+        cache_dir=Path(os.getenv("CACHE_DIR", "cache"))
     )
\ No newline at end of file
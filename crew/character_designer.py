@@ -1,16 +1,45 @@
 import openai
 import base64
 import tempfile
-from typing import Dict, List
+from functools import lru_cache
+from typing import List, Tuple
 from pathlib import Path
 from config.settings import load_settings
 from utils.logger import setup_logger
 from utils.helpers import retry_with_backoff
 from director.production_plan import Character
 
+# Base64 slice decoded per write; a multiple of 4 so slices decode independently
+_B64_CHUNK_SIZE = 1 << 16
+
 class CharacterDesigner:
     """Handles character design using OpenAI DALL-E 3"""
     
+    # Static prompt scaffolding for scene images, built once per class
+    _CHARACTER_BLOCK = """
+            Character {index} ({name}): {description}
+            - Visual style: {visual_style}
+            - Personality: {personality}
+            """
+    
+    _SCENE_PROMPT = """
+        Create a cinematic scene image with the following characters:
+        
+        {character_descriptions}
+        
+        Scene Description: {scene_description}
+        
+        Requirements:
+        - Each character must match their exact description above
+        - Professional cinematic quality
+        - Consistent with character personalities and visual styles
+        - High resolution, detailed, photorealistic
+        - Proper lighting and composition
+        - Characters should be clearly visible and recognizable
+        
+        Style: Professional cinematography, high quality, detailed, realistic
+        """
+    
     def __init__(self):
         self.settings = load_settings()
         self.logger = setup_logger("character_designer")
@@ -52,12 +81,7 @@ class CharacterDesigner:
                 n=1
             )
             
-            image_data = base64.b64decode(response.data[0].b64_json)
-
-            # Create a temporary file to save the image
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                temp_file.write(image_data)
-                temp_path = Path(temp_file.name)
+            temp_path = self._save_b64_image(response.data[0].b64_json)
 
             self.logger.info(f"Character reference saved to temporary file: {temp_path}")
             return temp_path
@@ -72,34 +96,17 @@ class CharacterDesigner:
         
         self.logger.info(f"Generating scene with characters: {[c.name for c in characters]}")
         
-        # Build character descriptions for the prompt
-        character_descriptions = []
-        for i, character in enumerate(characters, 1):
-            char_desc = f"""
-            Character {i} ({character.name}): {character.description}
-            - Visual style: {character.visual_style}
-            - Personality: {character.personality}
-            """
-            character_descriptions.append(char_desc)
+        # Build character descriptions for the prompt (shared by every scene with this cast)
+        character_descriptions = self._describe_characters(tuple(
+            (character.name, character.description, character.visual_style, character.personality)
+            for character in characters
+        ))
         
         # Combine character descriptions with scene
-        full_prompt = f"""
-        Create a cinematic scene image with the following characters:
-        
-        {chr(10).join(character_descriptions)}
-        
-        Scene Description: {scene_description}
-        
-        Requirements:
-        - Each character must match their exact description above
-        - Professional cinematic quality
-        - Consistent with character personalities and visual styles
-        - High resolution, detailed, photorealistic
-        - Proper lighting and composition
-        - Characters should be clearly visible and recognizable
-        
-        Style: Professional cinematography, high quality, detailed, realistic
-        """
+        full_prompt = self._SCENE_PROMPT.format(
+            character_descriptions=character_descriptions,
+            scene_description=scene_description
+        )
         
         try:
             response = self.client.images.generate(
@@ -111,16 +118,39 @@ class CharacterDesigner:
                 n=1
             )
             
-            image_data = base64.b64decode(response.data[0].b64_json)
-
-            # Create a temporary file to save the image
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                temp_file.write(image_data)
-                temp_path = Path(temp_file.name)
+            temp_path = self._save_b64_image(response.data[0].b64_json)
 
             self.logger.info(f"Character scene image saved to temporary file: {temp_path}")
             return temp_path
             
         except Exception as e:
             self.logger.error(f"Error generating scene image: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    @staticmethod
+    @lru_cache(maxsize=128)
+    def _describe_characters(profiles: Tuple[Tuple[str, str, str, str], ...]) -> str:
+        """Character block of the scene prompt for a cast of (name, description, visual_style, personality)"""
+        
+        return "\n".join(
+            CharacterDesigner._CHARACTER_BLOCK.format(
+                index=i,
+                name=name,
+                description=description,
+                visual_style=visual_style,
+                personality=personality
+            )
+            for i, (name, description, visual_style, personality) in enumerate(profiles, 1)
+        )
+    
+    def _save_b64_image(self, b64_data: str) -> Path:
+        """Decode a base64 image into a temporary PNG file
+        
+        Decodes slice by slice so the full decoded image is never held in
+        memory alongside the base64 string.
+        """
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
+            for start in range(0, len(b64_data), _B64_CHUNK_SIZE):
+                temp_file.write(base64.b64decode(b64_data[start:start + _B64_CHUNK_SIZE]))
+            return Path(temp_file.name)
\ No newline at end of file
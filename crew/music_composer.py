@@ -1,12 +1,35 @@
-import requests
-import os
-from typing import Dict, Optional, List
-from pathlib import Path
+import types
+from typing import Dict, List
 
 from config.settings import load_settings
 from utils.logger import setup_logger
 from utils.helpers import retry_with_backoff
 
+# Map moods to music parameters
+_MOOD_PARAMS = types.MappingProxyType({
+    "energetic": {"energy": "high", "tempo": "fast"},
+    "calm": {"energy": "low", "tempo": "slow"},
+    "dramatic": {"energy": "medium", "tempo": "medium"},
+    "educational": {"energy": "medium", "tempo": "medium"},
+    "inspiring": {"energy": "high", "tempo": "medium"},
+    "mysterious": {"energy": "low", "tempo": "slow"},
+    "upbeat": {"energy": "high", "tempo": "fast"}
+})
+_DEFAULT_MOOD = types.MappingProxyType({"energy": "medium", "tempo": "medium"})
+
+# Common sound effect keywords mapping
+_SFX_MAPPING = types.MappingProxyType({
+    "footsteps": "footsteps_concrete.wav",
+    "door": "door_open_close.wav",
+    "car": "car_engine.wav",
+    "crowd": "crowd_chatter.wav",
+    "nature": "nature_ambience.wav",
+    "office": "office_ambience.wav",
+    "rain": "rain_moderate.wav",
+    "wind": "wind_gentle.wav"
+})
+_SFX_KEYS = frozenset(_SFX_MAPPING)
+
 class MusicComposer:
     """Handles music and sound generation"""
     
@@ -20,18 +43,7 @@ class MusicComposer:
         
         self.logger.info(f"Generating background music: {mood} {style} ({duration}s)")
         
-        # Map moods to music parameters
-        mood_mapping = {
-            "energetic": {"energy": "high", "tempo": "fast"},
-            "calm": {"energy": "low", "tempo": "slow"},
-            "dramatic": {"energy": "medium", "tempo": "medium"},
-            "educational": {"energy": "medium", "tempo": "medium"},
-            "inspiring": {"energy": "high", "tempo": "medium"},
-            "mysterious": {"energy": "low", "tempo": "slow"},
-            "upbeat": {"energy": "high", "tempo": "fast"}
-        }
-        
-        mood_params = mood_mapping.get(mood, {"energy": "medium", "tempo": "medium"})
+        mood_params = _MOOD_PARAMS.get(mood, _DEFAULT_MOOD)
         
         # If a Beatoven (or any other) API key is provided via environment variables, we can
         # attempt to call the real service. Otherwise, fall back to a stub/placeholder URL so
@@ -70,24 +82,11 @@ class MusicComposer:
         
         self.logger.info(f"Generating sound effects for: {keywords}")
         
-        sound_effects = {}
-        
-        # Common sound effect keywords mapping
-        sfx_mapping = {
-            "footsteps": "footsteps_concrete.wav",
-            "door": "door_open_close.wav",
-            "car": "car_engine.wav",
-            "crowd": "crowd_chatter.wav",
-            "nature": "nature_ambience.wav",
-            "office": "office_ambience.wav",
-            "rain": "rain_moderate.wav",
-            "wind": "wind_gentle.wav"
-        }
-        
-        for keyword in keywords:
-            if keyword.lower() in sfx_mapping:
-                # In a real implementation, this would call a sound effects API
-                sfx_url = f"https://soundeffects-api.com/{sfx_mapping[keyword.lower()]}"
-                sound_effects[keyword] = sfx_url
+        # Match case-insensitively but keep the caller's keyword as the key
+        keywords_by_key = {keyword.lower(): keyword for keyword in keywords}
         
-        return sound_effects
\ No newline at end of file
+        # In a real implementation, this would call a sound effects API
+        return {
+            keywords_by_key[key]: f"https://soundeffects-api.com/{_SFX_MAPPING[key]}"
+            for key in _SFX_KEYS.intersection(keywords_by_key)
+        }
\ No newline at end of file
@@ -1,66 +1,254 @@
+import asyncio
+import contextvars
 import fal_client
+import json
 import os
-from typing import Dict, Optional, List
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from PIL import Image
 
 from config.settings import load_settings
 from utils.logger import setup_logger
-from utils.helpers import retry_with_backoff, create_character_reference_prompt
+from utils.deadline import deadline, remaining_budget
+from utils.helpers import generate_file_hash, retry_with_backoff
+from utils.reliability import get_bulkhead, get_circuit
+from utils.result_cache import ResultCache
 from director.production_plan import Character
 from crew.character_designer import CharacterDesigner
 
+# Account-wide cap on in-flight fal requests, shared by every endpoint
+_FAL_MAX_INFLIGHT = 8
+
+# Seconds between fal job status checks while waiting for a result
+_FAL_POLL_INTERVAL = 1.0
+
+# fal-hosted outputs stay downloadable for days; re-generate after a week
+_FAL_RESULT_TTL = 7 * 24 * 3600
+
+# Primary image-to-video model; raced against Veo 2 when enabled or recovering
+_KLING_I2V_ENDPOINT = "fal-ai/kling-video/v2.1/standard/image-to-video"
+
+# Conditioning images are sent as JPEGs no larger than the models' working size
+_REFERENCE_MAX_SIZE = (1024, 1024)
+_REFERENCE_JPEG_QUALITY = 85
+_REFERENCE_FORMAT = "jpeg-1024-q85"
+
+# How long an uploaded reference image URL is reused by other runs and workers
+_UPLOAD_TTL = 3600
+
+# Invariant prompt text, built once at import
+_BROLL_HEADER = "Cinematic quality, professional video production."
+_BROLL_STYLE = "\n".join((
+    "Camera movement: Smooth, professional cinematography",
+    "Lighting: Professional, cinematic lighting",
+    "Quality: High definition, sharp focus",
+    "Style: Documentary/cinematic style"
+))
+_TALKING_PROMPT = "\n".join((
+    "Professional presenter speaking to camera:",
+    "- Subtle facial movements and expressions",
+    "- Natural head movements",
+    "- Professional presentation style",
+    "- Engaging eye contact with camera",
+    "- Minimal but realistic motion"
+))
+
 class VisualArtist:
     """Handles video generation using scene images converted to video"""
     
+    # fal CDN URLs of uploaded local images keyed by (path, mtime), shared for the whole run
+    _uploaded: Dict[Tuple[str, float], str] = {}
+    
+    # Content key behind each uploaded URL, so job keys survive re-uploads
+    _url_sources: Dict[str, str] = {}
+    
+    # Guards the on-disk log of in-flight fal jobs
+    _jobs_lock = threading.Lock()
+    
     def __init__(self):
         self.settings = load_settings()
         self.logger = setup_logger("visual_artist")
         os.environ["FAL_KEY"] = self.settings.api.fal_key
         self.character_designer = CharacterDesigner()
+        self.result_cache = ResultCache(self.settings.cache_dir / "broll.db", default_ttl=_FAL_RESULT_TTL)
+        self.upload_cache = ResultCache(self.settings.cache_dir / "uploads.db", default_ttl=_UPLOAD_TTL)
+        self.jobs_path = self.settings.cache_dir / "fal_jobs.json"
         
-    @retry_with_backoff(max_retries=3)
-    def generate_broll_video(self, scene_description: str, duration: float, mood: str = "neutral") -> str:
-        """Generate B-roll video using Veo 3"""
+        # Caps concurrent fal generations started through the *_async methods
+        self._fal_slots = asyncio.Semaphore(self.settings.max_concurrency)
+    
+    async def _run_bounded(self, func, *args):
+        """Run a blocking generation call in a worker thread, bounded by the fal limit
         
-        self.logger.info(f"Generating B-roll video: {scene_description[:50]}... (duration: {duration}s)")
+        The whole call, retries included, gets ``settings.scene_timeout``
+        seconds from when it acquires a slot.
+        """
         
-        # Enhanced prompt for Veo 3
-        enhanced_prompt = f"""
-        {scene_description}
+        async with self._fal_slots:
+            with deadline(self.settings.scene_timeout):
+                worker = asyncio.ensure_future(asyncio.to_thread(func, *args))
+                try:
+                    async with asyncio.timeout(remaining_budget()):
+                        return await asyncio.shield(worker)
+                except TimeoutError:
+                    # The thread can't be interrupted; keep its slot until it sees the
+                    # same deadline, cancels its fal job and returns
+                    await asyncio.gather(worker, return_exceptions=True)
+                    raise
+    
+    async def generate_broll_video_async(self, scene_description: str, duration: float, mood: str = "neutral") -> str:
+        """Async variant of generate_broll_video"""
+        return await self._run_bounded(self.generate_broll_video, scene_description, duration, mood)
+    
+    async def generate_character_video_with_references_async(self, characters: List[Character], scene_description: str, duration: float) -> str:
+        """Async variant of generate_character_video_with_references"""
+        return await self._run_bounded(self.generate_character_video_with_references, characters, scene_description, duration)
+    
+    async def generate_talking_avatar_async(self, character: Character, audio_path: Path, duration: float) -> str:
+        """Async variant of generate_talking_avatar"""
+        return await self._run_bounded(self.generate_talking_avatar, character, audio_path, duration)
         
-        Cinematic quality, professional video production.
-        Mood: {mood}
-        Duration: {duration} seconds
+    def _run_fal(self, endpoint: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Submit a fal job and wait for it, behind the endpoint's circuit and the fal bulkhead
         
-        Camera movement: Smooth, professional cinematography
-        Lighting: Professional, cinematic lighting
-        Quality: High definition, sharp focus
-        Style: Documentary/cinematic style
+        Request ids are logged to disk until the job finishes, so if the
+        process dies mid-generation the next identical call picks the job
+        back up instead of paying for a new one.
         """
         
-        try:
-            handler = fal_client.submit(
-                "fal-ai/veo3",  # Correct Veo 3 endpoint
-                arguments={
-                    "prompt": enhanced_prompt,
-                    "duration": "8s",  # Veo 3 max duration
-                    "aspect_ratio": "16:9",
-                    # "resolution": "720p",
-                    # "quality": "high",
-                    "generate_audio": False  # Disable audio to save costs
-                }
-            )
-            
-            result = handler.get()
+        # Uploaded image URLs expire, so key the job on the image content instead
+        stable_arguments = {
+            name: self._url_sources.get(value, value) if name == "image_url" else value
+            for name, value in arguments.items()
+        }
+        job_key = ResultCache.make_key(endpoint, stable_arguments)
+        
+        with get_circuit(endpoint), get_bulkhead("fal", _FAL_MAX_INFLIGHT):
+            job = self._load_jobs().get(job_key)
+            try:
+                if job:
+                    self.logger.info(f"Resuming fal job {job['request_id']} on {endpoint}")
+                    result = self._wait_for_result(endpoint, job["request_id"])
+                else:
+                    handler = fal_client.submit(endpoint, arguments=arguments)
+                    self._update_jobs(job_key, {"endpoint": endpoint, "request_id": handler.request_id})
+                    result = self._wait_for_result(endpoint, handler.request_id)
+            except Exception:
+                # A failed job can't be resumed; interrupts (Ctrl-C, cancellation) keep the entry
+                self._update_jobs(job_key, None)
+                raise
             
-            # Handle different possible response structures
-            if "video" in result and "url" in result["video"]:
-                video_url = result["video"]["url"]
-            elif "url" in result:
-                video_url = result["url"]
+            self._update_jobs(job_key, None)
+            return result
+    
+    def _wait_for_result(self, endpoint: str, request_id: str) -> Dict[str, Any]:
+        """Poll a fal job until it completes, cancelling it once the caller's deadline passes"""
+        
+        while not isinstance(fal_client.status(endpoint, request_id), fal_client.Completed):
+            budget = remaining_budget()
+            if budget is not None and budget <= 0:
+                self.logger.warning(f"Deadline reached, cancelling fal job {request_id} on {endpoint}")
+                try:
+                    fal_client.cancel(endpoint, request_id)
+                except Exception as e:
+                    self.logger.warning(f"Could not cancel fal job {request_id}: {e}")
+                raise TimeoutError(f"fal job {request_id} on {endpoint} ran past its deadline")
+            time.sleep(_FAL_POLL_INTERVAL if budget is None else min(_FAL_POLL_INTERVAL, budget))
+        
+        return fal_client.result(endpoint, request_id)
+    
+    def _load_jobs(self) -> Dict[str, Dict[str, str]]:
+        """Read the in-flight fal job log"""
+        
+        try:
+            with open(self.jobs_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+    
+    def _update_jobs(self, job_key: str, job: Optional[Dict[str, str]]) -> None:
+        """Record (or with ``None``, clear) a job, replacing the log file atomically"""
+        
+        with self._jobs_lock:
+            jobs = self._load_jobs()
+            if job is None:
+                if jobs.pop(job_key, None) is None:
+                    return
             else:
-                self.logger.error(f"Unexpected response structure: {result}")
-                raise Exception(f"Could not find video URL in response: {result}")
+                jobs[job_key] = job
+            
+            self.jobs_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = self.jobs_path.with_suffix(".tmp")
+            with open(temp_path, "w") as f:
+                json.dump(jobs, f)
+            os.replace(temp_path, self.jobs_path)
+    
+    def _image_url(self, image_path) -> str:
+        """fal URL for a local image, uploaded once per file version
+        
+        Uploads are also recorded on disk by content hash, so other processes
+        (and later runs) holding the same image skip the upload.
+        """
+        
+        path = str(image_path)
+        key = (path, os.path.getmtime(path))
+        if key not in self._uploaded:
+            content_key = ResultCache.make_key("fal_upload", generate_file_hash(path), _REFERENCE_FORMAT)
+            url = self.upload_cache.get(content_key)
+            if not url:
+                reference_path = self._prepare_reference(path)
+                try:
+                    url = fal_client.upload_file(str(reference_path))
+                finally:
+                    reference_path.unlink(missing_ok=True)
+                self.upload_cache.set(content_key, url)
+            self._uploaded[key] = url
+            self._url_sources[url] = content_key
+        return self._uploaded[key]
+    
+    @staticmethod
+    def _prepare_reference(image_path: str) -> Path:
+        """Downsample an image to a compact temporary JPEG; the caller deletes it"""
+        
+        with Image.open(image_path) as image:
+            image = image.convert("RGB")
+            image.thumbnail(_REFERENCE_MAX_SIZE)
+            with tempfile.NamedTemporaryFile(delete=False, suffix=".jpg") as temp_file:
+                image.save(temp_file, "JPEG", quality=_REFERENCE_JPEG_QUALITY, optimize=True)
+                return Path(temp_file.name)
+    
+    @staticmethod
+    def _extract_video_url(result: Dict[str, Any], source: str = "fal") -> str:
+        """Pull the video URL out of a fal result, whichever shape it has"""
+        
+        if "video" in result and "url" in result["video"]:
+            return result["video"]["url"]
+        elif "url" in result:
+            return result["url"]
+        else:
+            raise Exception(f"Could not find video URL in {source} response: {result}")
+    
+    @retry_with_backoff(max_retries=3)
+    def generate_broll_video(self, scene_description: str, duration: float, mood: str = "neutral") -> str:
+        """Generate B-roll video using Veo 3"""
+        
+        self.logger.info(f"Generating B-roll video: {scene_description[:50]}... (duration: {duration}s)")
+        
+        # Veo 3 always renders 8s at 16:9, so duration doesn't change the output
+        cache_key = ResultCache.make_key("fal-ai/veo3", scene_description, mood, "8s", "16:9")
+        cached_url = self.result_cache.get(cache_key)
+        if cached_url:
+            self.logger.info(f"B-roll video served from cache: {cached_url}")
+            return cached_url
+        
+        try:
+            result = self._run_fal("fal-ai/veo3", self._broll_arguments(scene_description, duration, mood))
+            video_url = self._extract_video_url(result, "Veo 3")
+            self.result_cache.set(cache_key, video_url)
             
             self.logger.info(f"B-roll video generated: {video_url}")
             return video_url
@@ -69,6 +257,29 @@ class VisualArtist:
             self.logger.error(f"Error generating B-roll video: {e}")
             raise
     
+    def _broll_arguments(self, scene_description: str, duration: float, mood: str) -> Dict[str, Any]:
+        """Veo 3 request arguments for a B-roll scene"""
+        
+        # Enhanced prompt for Veo 3
+        enhanced_prompt = "\n".join((
+            scene_description,
+            "",
+            _BROLL_HEADER,
+            f"Mood: {mood}",
+            f"Duration: {duration} seconds",
+            "",
+            _BROLL_STYLE
+        ))
+        
+        return {
+            "prompt": enhanced_prompt,
+            "duration": "8s",  # Veo 3 max duration
+            "aspect_ratio": "16:9",
+            # "resolution": "720p",
+            # "quality": "high",
+            "generate_audio": False  # Disable audio to save costs
+        }
+    
     @retry_with_backoff(max_retries=3)
     def generate_character_video_with_references(self, characters: List[Character], scene_description: str, duration: float) -> str:
         """Generate video by first creating scene image, then converting to video"""
@@ -76,6 +287,21 @@ class VisualArtist:
         char_names = [c.name for c in characters]
         self.logger.info(f"Generating character video with: {char_names}")
         
+        # Reference image contents identify the characters' looks (paths are per-run temp files)
+        cache_key = ResultCache.make_key(
+            "character_video",
+            [
+                (c.name, generate_file_hash(c.reference_image_url) if c.reference_image_url else None)
+                for c in characters
+            ],
+            scene_description,
+            round(duration)
+        )
+        cached_url = self.result_cache.get(cache_key)
+        if cached_url:
+            self.logger.info(f"Character video served from cache: {cached_url}")
+            return cached_url
+        
         try:
             # Step 1: Generate scene image with characters using DALL-E 3
             self.logger.info("Step 1: Generating scene image with characters...")
@@ -87,6 +313,7 @@ class VisualArtist:
             # Step 2: Convert scene image to video using image-to-video model
             self.logger.info("Step 2: Converting scene image to video...")
             video_url = self._convert_image_to_video(scene_image_path, scene_description, duration)
+            self.result_cache.set(cache_key, video_url)
             
             self.logger.info(f"Character video scene generated: {video_url}")
             return video_url
@@ -112,65 +339,105 @@ class VisualArtist:
         - High quality video production
         """
         
+        # Upload the image once so every fallback can reference it by URL;
+        # without it only the text-to-video fallback is possible
+        self.logger.info("Uploading image file...")
+        try:
+            image_url = self._image_url(image_path)
+        except Exception as e:
+            self.logger.error(f"Error uploading image for image-to-video, using text-to-video: {e}")
+            return self._fallback_text_to_video(scene_description, duration)
+        
+        # Latency-critical or Kling just recovering: take whichever provider finishes first
+        raced = self.settings.race_image_to_video or get_circuit(_KLING_I2V_ENDPOINT).probing
+        
         try:
-            # Encode the image file as a data URL
-            self.logger.info("Encoding image file...")
-            image_data_url = fal_client.encode_file(str(image_path))
+            if raced:
+                self.logger.info("Racing Kling 2.1 against Veo 2 Image-to-Video...")
+                return self._first_success(
+                    lambda: self._convert_with_kling(image_url, motion_prompt),
+                    lambda: self._convert_with_veo2(image_url, motion_prompt, duration)
+                )
             
             # First preference: Kling 2.1 Standard
             self.logger.info("Using Kling 2.1 Standard Image-to-Video...")
-            handler = fal_client.submit(
-                "fal-ai/kling-video/v2.1/standard/image-to-video",
-                arguments={
-                    "image_url": image_data_url,
-                    "prompt": motion_prompt,
-                    "duration": "5",  # Kling supports up to 10s
-                    # "aspect_ratio": "16:9",
-                    "cfg_scale": 0.5,  # Classifier Free Guidance scale
-                    # "seed": 42
-                }
-            )
-            
-            result = handler.get()
-            
-            # Handle different possible response structures
-            if "video" in result and "url" in result["video"]:
-                video_url = result["video"]["url"]
-            elif "url" in result:
-                video_url = result["url"]
-            else:
-                self.logger.error(f"Unexpected response structure: {result}")
-                raise Exception(f"Could not find video URL in response: {result}")
+            video_url = self._convert_with_kling(image_url, motion_prompt)
             
             self.logger.info(f"Image converted to video with Kling 2.1: {video_url}")
             return video_url
             
         except Exception as e:
-            self.logger.error(f"Error converting image to video with Kling 2.1: {e}")
-            # Fallback to Veo 2 Image-to-Video
+            if raced:
+                # Veo 2 already ran (and failed) in the race, so don't pay for it again
+                self.logger.error(f"Error converting image to video with Kling 2.1 and Veo 2: {e}")
+            else:
+                self.logger.error(f"Error converting image to video with Kling 2.1: {e}")
+                # Fallback to Veo 2 Image-to-Video
+                try:
+                    self.logger.info("Trying fallback: Veo 2 Image-to-Video...")
+                    return self._convert_with_veo2(image_url, motion_prompt, duration)
+                except Exception as e2:
+                    self.logger.error(f"Error with Veo 2 fallback: {e2}")
+            
+            # Final fallback: Stable Video Diffusion
             try:
-                self.logger.info("Trying fallback: Veo 2 Image-to-Video...")
-                return self._convert_with_veo2(image_data_url, motion_prompt, duration)
-            except Exception as e2:
-                self.logger.error(f"Error with Veo 2 fallback: {e2}")
-                # Final fallback: Stable Video Diffusion
+                self.logger.info("Trying final fallback: Stable Video Diffusion...")
+                return self._convert_with_stable_video(image_url, motion_prompt, duration)
+            except Exception as e3:
+                self.logger.error(f"Error with Stable Video fallback: {e3}")
+                # Ultimate fallback: Generate text-to-video with scene description
+                return self._fallback_text_to_video(scene_description, duration)
+    
+    def _convert_with_kling(self, image_url: str, motion_prompt: str) -> str:
+        """Convert using Kling 2.1 Standard Image-to-Video"""
+        
+        result = self._run_fal(
+            _KLING_I2V_ENDPOINT,
+            arguments={
+                "image_url": image_url,
+                "prompt": motion_prompt,
+                "duration": "5",  # Kling supports up to 10s
+                # "aspect_ratio": "16:9",
+                "cfg_scale": 0.5,  # Classifier Free Guidance scale
+                # "seed": 42
+            }
+        )
+        
+        return self._extract_video_url(result, "Kling 2.1")
+    
+    def _first_success(self, *attempts: Callable[[], str]) -> str:
+        """Run attempts concurrently and return the first one that succeeds
+        
+        The losers are abandoned rather than cancelled: their fal jobs keep
+        running (and billing) server-side, and their worker threads keep
+        holding fal bulkhead slots until those jobs finish. That is why
+        racing is opt-in.
+        """
+        
+        executor = ThreadPoolExecutor(max_workers=len(attempts))
+        try:
+            # Each attempt gets a copy of the caller's context so deadlines carry over
+            futures = [executor.submit(contextvars.copy_context().run, attempt) for attempt in attempts]
+            error = None
+            for future in as_completed(futures):
                 try:
-                    self.logger.info("Trying final fallback: Stable Video Diffusion...")
-                    return self._convert_with_stable_video(image_path, motion_prompt, duration)
-                except Exception as e3:
-                    self.logger.error(f"Error with Stable Video fallback: {e3}")
-                    # Ultimate fallback: Generate text-to-video with scene description
-                    return self._fallback_text_to_video(scene_description, duration)
+                    return future.result()
+                except Exception as e:
+                    self.logger.error(f"Raced provider failed: {e}")
+                    error = e
+            raise error
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
     
     @retry_with_backoff(max_retries=2)
-    def _convert_with_veo2(self, image_data_url: str, motion_prompt: str, duration: float) -> str:
+    def _convert_with_veo2(self, image_url: str, motion_prompt: str, duration: float) -> str:
         """Fallback: Convert using Veo 2 Image-to-Video"""
         
         try:
-            handler = fal_client.submit(
+            result = self._run_fal(
                 "fal-ai/veo-2-image-to-video",
                 arguments={
-                    "image_url": image_data_url,
+                    "image_url": image_url,
                     "prompt": motion_prompt,
                     "duration": min(duration, 8.0),
                     "aspect_ratio": "16:9",
@@ -178,31 +445,21 @@ class VisualArtist:
                 }
             )
             
-            result = handler.get()
-            
-            if "video" in result and "url" in result["video"]:
-                return result["video"]["url"]
-            elif "url" in result:
-                return result["url"]
-            else:
-                raise Exception(f"Could not find video URL in Veo 2 response: {result}")
+            return self._extract_video_url(result, "Veo 2")
                 
         except Exception as e:
             self.logger.error(f"Veo 2 conversion failed: {e}")
             raise
 
     @retry_with_backoff(max_retries=2)
-    def _convert_with_stable_video(self, image_path: Path, motion_prompt: str, duration: float) -> str:
+    def _convert_with_stable_video(self, image_url: str, motion_prompt: str, duration: float) -> str:
         """Fallback: Convert using Stable Video Diffusion"""
         
         try:
-            # Encode the image file as a data URL
-            image_data_url = fal_client.encode_file(str(image_path))
-            
-            handler = fal_client.submit(
+            result = self._run_fal(
                 "fal-ai/stable-video",  # Stable Video Diffusion
                 arguments={
-                    "image_url": image_data_url,
+                    "image_url": image_url,
                     "motion_bucket_id": 127,  # Controls motion amount
                     "cond_aug": 0.02,  # Conditioning augmentation
                     "seed": 42,
@@ -211,14 +468,7 @@ class VisualArtist:
                 }
             )
             
-            result = handler.get()
-            
-            if "video" in result and "url" in result["video"]:
-                return result["video"]["url"]
-            elif "url" in result:
-                return result["url"]
-            else:
-                raise Exception(f"Could not find video URL in Stable Video response: {result}")
+            return self._extract_video_url(result, "Stable Video")
                 
         except Exception as e:
             self.logger.error(f"Stable Video conversion failed: {e}")
@@ -231,7 +481,7 @@ class VisualArtist:
         self.logger.info("Using final fallback: text-to-video generation")
         
         try:
-            handler = fal_client.submit(
+            result = self._run_fal(
                 "fal-ai/veo3",  # Veo 3 text-to-video as final fallback
                 arguments={
                     "prompt": scene_description,
@@ -242,14 +492,7 @@ class VisualArtist:
                 }
             )
             
-            result = handler.get()
-            
-            if "video" in result and "url" in result["video"]:
-                return result["video"]["url"]
-            elif "url" in result:
-                return result["url"]
-            else:
-                raise Exception(f"Could not find video URL in Veo3 response: {result}")
+            return self._extract_video_url(result, "Veo3")
                 
         except Exception as e:
             self.logger.error(f"Final fallback failed: {e}")
@@ -263,25 +506,15 @@ class VisualArtist:
         
         try:
             # For talking avatars, use the character's image with subtle motion
-            character_image_data_url = fal_client.encode_file(character.reference_image_url)
-            
-            # Enhanced prompt for talking motion
-            talking_prompt = f"""
-            Professional presenter speaking to camera:
-            - Subtle facial movements and expressions
-            - Natural head movements
-            - Professional presentation style
-            - Engaging eye contact with camera
-            - Minimal but realistic motion
-            """
+            character_image_url = self._image_url(character.reference_image_url)
             
             # Try Kling 2.1 Standard first for talking avatars too
             self.logger.info("Using Kling 2.1 Standard for talking avatar...")
-            handler = fal_client.submit(
+            result = self._run_fal(
                 "fal-ai/kling-video/v1/standard/image-to-video",
                 arguments={
-                    "image_url": character_image_data_url,
-                    "prompt": talking_prompt,
+                    "image_url": character_image_url,
+                    "prompt": _TALKING_PROMPT,
                     "duration": min(duration, 10.0),
                     "aspect_ratio": "16:9",
                     "cfg_scale": 0.3,  # Lower CFG for more subtle motion
@@ -289,16 +522,7 @@ class VisualArtist:
                 }
             )
             
-            result = handler.get()
-            
-            # Handle different possible response structures  
-            if "video" in result and "url" in result["video"]:
-                video_url = result["video"]["url"]
-            elif "url" in result:
-                video_url = result["url"]
-            else:
-                self.logger.error(f"Unexpected response structure: {result}")
-                raise Exception(f"Could not find video URL in response: {result}")
+            video_url = self._extract_video_url(result, "Kling")
             
             self.logger.info(f"Talking avatar generated with Kling 2.1: {video_url}")
             return video_url
@@ -309,10 +533,10 @@ class VisualArtist:
             try:
                 self.logger.info("Fallback: Using Stable Video Diffusion for talking avatar...")
                 
-                handler = fal_client.submit(
+                result = self._run_fal(
                     "fal-ai/stable-video",
                     arguments={
-                        "image_url": character_image_data_url,
+                        "image_url": character_image_url,
                         "motion_bucket_id": 40,  # Lower motion for subtle talking movement
                         "cond_aug": 0.02,
                         "seed": 42,
@@ -321,14 +545,7 @@ class VisualArtist:
                     }
                 )
                 
-                result = handler.get()
-                
-                if "video" in result and "url" in result["video"]:
-                    return result["video"]["url"]
-                elif "url" in result:
-                    return result["url"]
-                else:
-                    raise Exception(f"Could not find video URL in Stable Video response: {result}")
+                return self._extract_video_url(result, "Stable Video")
                     
             except Exception as e2:
                 self.logger.error(f"Error with Stable Video fallback: {e2}")
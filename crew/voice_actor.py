@@ -1,12 +1,29 @@
+import hashlib
 import os
+import re
+import tempfile
+import time
+import types
+import ffmpeg
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import List, Mapping, Optional, Tuple
 from elevenlabs.client import ElevenLabs
-from elevenlabs import save, Voice, VoiceSettings, ElevenLabs
+from elevenlabs import Voice, VoiceSettings, ElevenLabs
 
 from config.settings import load_settings
 from utils.logger import setup_logger
 from utils.helpers import retry_with_backoff
+from utils.reliability import with_bulkhead, with_circuit
+
+_MODEL_ID = "eleven_multilingual_v2"
+
+# Scripts longer than this are split at sentence boundaries and voiced in parallel
+_CHUNK_CHARS = 400
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+# How long the voice catalogue is reused before being fetched again
+_VOICES_TTL = 600.0
 
 class VoiceActor:
     """Handles text-to-speech generation with ElevenLabs"""
@@ -16,6 +33,9 @@ class VoiceActor:
         self.logger = setup_logger("voice_actor")
         self.client = ElevenLabs(api_key=self.settings.api.elevenlabs_api_key)
         
+        # Voice catalogue cache: (fetched_at, read-only voice records)
+        self._voices_cache: Optional[Tuple[float, Tuple[Mapping[str, str], ...]]] = None
+        
         # Voice configuration
         self.voice_settings = VoiceSettings(
             stability=0.75,
@@ -31,21 +51,21 @@ class VoiceActor:
         self.logger.info(f"Generating voiceover for script length: {len(script)} characters")
         
         if output_path is None:
-            output_path = self.settings.temp_dir / f"voiceover_{hash(script)}.mp3"
+            # Content-addressed, so identical script + voice is reused across runs
+            key = hashlib.blake2b(f"{voice_id}|{_MODEL_ID}|{script}".encode()).hexdigest()[:24]
+            output_path = self.settings.temp_dir / f"vo_{key}.mp3"
+            if output_path.exists() and output_path.stat().st_size > 0:
+                self.logger.info(f"Reusing cached voiceover: {output_path}")
+                return output_path
         
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         try:
-            # Generate audio
-            audio = self.client.text_to_speech.convert(
-                text=script,
-                voice_id=voice_id,
-                voice_settings=self.voice_settings,
-                model_id="eleven_multilingual_v2"
-            )
-            
-            # Save audio file
-            save(audio, str(output_path))
+            chunks = self._split_script(script)
+            if len(chunks) == 1:
+                self._stream_to_file(script, voice_id, output_path)
+            else:
+                self._generate_chunked(chunks, voice_id, output_path)
             
             self.logger.info(f"Voiceover saved to: {output_path}")
             return output_path
@@ -54,20 +74,117 @@ class VoiceActor:
             self.logger.error(f"Error generating voiceover: {e}")
             raise
     
-    def get_available_voices(self) -> List[Dict[str, str]]:
-        """Get list of available voices"""
+    @staticmethod
+    def _split_script(script: str, max_chars: int = _CHUNK_CHARS) -> List[str]:
+        """Group sentences into chunks of roughly ``max_chars`` characters"""
+        
+        chunks: List[str] = []
+        current = ""
+        for sentence in _SENTENCE_END.split(script.strip()):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                chunks.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}" if current else sentence
+        
+        if current or not chunks:
+            chunks.append(current)
+        return chunks
+    
+    def _generate_chunked(self, chunks: List[str], voice_id: str, output_path: Path) -> None:
+        """Voice each chunk in parallel and join the MP3 segments with ffmpeg's concat demuxer"""
+        
+        self.logger.info(f"Generating voiceover in {len(chunks)} parallel chunks")
+        
+        with tempfile.TemporaryDirectory(dir=output_path.parent) as work_dir:
+            part_paths = [Path(work_dir) / f"part_{i:03d}.mp3" for i in range(len(chunks))]
+            
+            # Neighbouring text keeps prosody continuous across chunk boundaries
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [
+                    executor.submit(
+                        self._stream_to_file, chunk, voice_id, part_path,
+                        chunks[i - 1] if i > 0 else None,
+                        chunks[i + 1] if i + 1 < len(chunks) else None
+                    )
+                    for i, (chunk, part_path) in enumerate(zip(chunks, part_paths))
+                ]
+                for future in futures:
+                    future.result()
+            
+            list_path = Path(work_dir) / "parts.txt"
+            list_path.write_text("".join(f"file '{path.name}'\n" for path in part_paths))
+            
+            joined_path = Path(work_dir) / "joined.mp3"
+            (
+                ffmpeg
+                .input(str(list_path), format="concat", safe=0)
+                .output(str(joined_path), c="copy")
+                .overwrite_output()
+                .run(quiet=True)
+            )
+            os.replace(joined_path, output_path)
+    
+    @with_circuit("elevenlabs")
+    @with_bulkhead("elevenlabs", max_inflight=4)
+    def _stream_to_file(self, text: str, voice_id: str, output_path: Path,
+                        previous_text: Optional[str] = None, next_text: Optional[str] = None) -> None:
+        """Stream one ElevenLabs request straight to disk"""
+        
+        audio_stream = self.client.text_to_speech.stream(
+            voice_id=voice_id,
+            text=text,
+            voice_settings=self.voice_settings,
+            model_id=_MODEL_ID,
+            output_format="mp3_44100_128",
+            previous_text=previous_text,
+            next_text=next_text
+        )
+        
+        # Write to a temp name first so a failed stream never leaves a cache-hit-sized file
+        partial_path = output_path.with_suffix(".part")
+        with open(partial_path, "wb") as f:
+            for chunk in audio_stream:
+                if chunk:
+                    f.write(chunk)
+        os.replace(partial_path, output_path)
+    
+    def get_available_voices(self) -> List[Mapping[str, str]]:
+        """Get list of available voices (cached for ``_VOICES_TTL`` seconds)"""
+        
+        if self._voices_cache and time.monotonic() - self._voices_cache[0] < _VOICES_TTL:
+            return list(self._voices_cache[1])
         
         try:
-            voices = self.client.voices.search(include_total_count=True)
-            return [
-                {
+            voices = self._fetch_voices()
+        except Exception as e:
+            self.logger.error(f"Error fetching voices: {e}")
+            return []
+        
+        self._voices_cache = (time.monotonic(), voices)
+        return list(voices)
+    
+    def _fetch_voices(self) -> Tuple[Mapping[str, str], ...]:
+        """Fetch every page of the voice catalogue
+        
+        Pages are cursor-linked (each response carries the next token), so
+        they are walked in order rather than requested concurrently.
+        """
+        
+        records = []
+        page_token = None
+        while True:
+            page = self.client.voices.search(page_size=100, next_page_token=page_token)
+            records.extend(
+                types.MappingProxyType({
                     "voice_id": voice.voice_id,
                     "name": voice.name,
                     "category": voice.category,
                     "description": voice.description or ""
-                }
-                for voice in voices.voices
-            ]
-        except Exception as e:
-            self.logger.error(f"Error fetching voices: {e}")
-            return []
\ No newline at end of file
+                })
+                for voice in page.voices
+            )
+            
+            page_token = page.next_page_token
+            if not page.has_more or not page_token:
+                return tuple(records)
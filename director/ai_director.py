@@ -1,13 +1,184 @@
+import asyncio
+import atexit
+import functools
+import hashlib
+import os
 import json
+import time
+import re
 import uuid
+import httpx
+import numpy as np
 from datetime import datetime
-from typing import Dict, List, Any
-from groq import Groq
+from pathlib import Path
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Generator, List, Any, Optional, Tuple, Union
+from groq import AsyncGroq, Groq
 
 from config.settings import load_settings
 from utils.logger import setup_logger
 from utils.helpers import retry_with_backoff
 from director.production_plan import ProductionPlan, Theme, Character, Scene
+from director.llm_cache import LLMCache
+from director.rhythm_solver import solve_timings
+
+if TYPE_CHECKING:
+    from analysis.audio_analyzer import AudioAnalyzer
+
+# Kept byte-stable and first in the message list so Groq can reuse its prefix cache
+SYSTEM_PROMPT_PLAN = """You are an AI Video Director creating professional video content. Analyze the user's brief and create a comprehensive production plan.
+
+Return a JSON object with this EXACT structure:
+{
+  "title": "Video title",
+  "theme": {
+    "visual_style": "cinematic/documentary/corporate/artistic",
+    "color_palette": ["#color1", "#color2", "#color3"],
+    "mood": "energetic/calm/dramatic/educational",
+    "lighting": "natural/dramatic/soft/bright",
+    "art_style": "realistic/stylized/animated"
+  },
+  "script": "Full voiceover script with <break time='1.5s'/> SSML tags for natural pauses",
+  "characters": [
+    {
+      "name": "character_name",
+      "description": "detailed visual description for consistency (age, appearance, clothing, style)",
+      "visual_style": "professional/casual/animated",
+      "personality": "confident/friendly/authoritative"
+    }
+  ],
+  "scenes": [
+    {
+      "id": "scene_1",
+      "description": "detailed visual description of what happens in this scene",
+      "script_segment": "part of script for this scene",
+      "duration_estimate": 5.0,
+      "visual_type": "character/broll/talking_avatar/static",
+      "characters": ["character_name1", "character_name2"],
+      "mood": "scene mood",
+      "camera_angle": "close/medium/wide/overhead"
+    }
+  ]
+}
+
+Guidelines:
+- Use SSML <break time="1.5s"/> tags for natural pauses in script
+- Each scene should be 3-8 seconds for good pacing
+- Mix visual types for engagement
+- Ensure character descriptions are detailed for visual consistency
+- Script should be conversational and engaging
+- List all characters that appear in each scene in the "characters" array"""
+
+SYSTEM_PROMPT_REFINE = (
+    "You are an expert video editor syncing visuals to audio rhythm. "
+    "Scenes arrive as id,dur CSV rows and audio events as comma-separated times in seconds. "
+    "Return only JSON with timing data."
+)
+
+# Break/emphasis times sent to the refinement model, earliest first
+_MAX_PROMPT_EVENTS = 40
+
+# Completion ceilings: a full plan (scripts included) can run long, while the
+# refinement reply is one timing object per scene; the per-scene allowance
+# leaves room for indented JSON, and the floor covers short plans
+_PLAN_MAX_TOKENS = 4000
+_REFINE_MIN_TOKENS = 800
+_REFINE_BASE_TOKENS = 64
+_REFINE_TOKENS_PER_SCENE = 80
+
+# Both calls use Groq's JSON mode, which guarantees a single JSON object
+_JSON_MODE = {"type": "json_object"}
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+def _parse_json_reply(content: str) -> Any:
+    """Parse a model's JSON reply, repairing common drift before giving up
+    
+    Strips code fences and surrounding prose and drops trailing commas;
+    re-raises the original error if the repaired text still doesn't parse.
+    """
+    
+    try:
+        return json.loads(content)
+    except json.JSONDecodeError as error:
+        starts = [i for i in (content.find("{"), content.find("[")) if i != -1]
+        end = max(content.rfind("}"), content.rfind("]"))
+        if not starts or end < min(starts):
+            raise error
+        
+        repaired = _TRAILING_COMMA.sub(r"\1", content[min(starts):end + 1])
+        try:
+            return json.loads(repaired)
+        except json.JSONDecodeError:
+            raise error
+
+# Connection pool shared by every director in the process
+_HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+@functools.lru_cache(maxsize=None)
+def _get_groq_client(api_key: str) -> Groq:
+    """Process-wide sync Groq client, so keep-alive connections are reused"""
+    
+    client = Groq(api_key=api_key, http_client=httpx.Client(limits=_HTTP_LIMITS))
+    atexit.register(client.close)
+    return client
+
+@functools.lru_cache(maxsize=None)
+def _get_async_groq_client(api_key: str) -> AsyncGroq:
+    """Process-wide async Groq client; its pool closes with the process"""
+    
+    return AsyncGroq(api_key=api_key, http_client=httpx.AsyncClient(limits=_HTTP_LIMITS))
+
+class _SceneStreamParser:
+    """Pulls each complete object out of the "scenes" array of a streamed JSON reply"""
+    
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._in_scenes = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = 0
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """Add streamed text and return any scene objects it completed"""
+        
+        self.buffer += text
+        completed = []
+        
+        if not self._in_scenes:
+            key = self.buffer.find('"scenes"')
+            bracket = self.buffer.find("[", key) if key != -1 else -1
+            if bracket == -1:
+                return completed
+            self._in_scenes = True
+            self._pos = bracket + 1
+        
+        # Track string/brace state across chunks so braces inside text don't count
+        while self._pos < len(self.buffer) and not self._done:
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    completed.append(json.loads(self.buffer[self._object_start:self._pos + 1]))
+            elif char == "]" and self._depth == 0:
+                self._done = True
+            self._pos += 1
+        
+        return completed
 
 class AIDirector:
     """The AI Director - orchestrates the entire video production pipeline"""
@@ -15,95 +186,39 @@ class AIDirector:
     def __init__(self):
         self.settings = load_settings()
         self.logger = setup_logger("ai_director")
-        self.groq_client = Groq(api_key=self.settings.api.groq_api_key)
+        self.groq_client = _get_groq_client(self.settings.api.groq_api_key)
+        self.async_groq_client = _get_async_groq_client(self.settings.api.groq_api_key)
+        self.llm_cache = LLMCache(self.settings.cache_dir / "llm.db")
+        self.plan_cache_dir = self.settings.cache_dir / "plans"
         
     @retry_with_backoff(max_retries=3)
     def create_production_plan(self, user_brief: str) -> ProductionPlan:
         """Phase 1: Create comprehensive production plan from user brief"""
         
+        return self._run(self._plan_steps(user_brief))
+    
+    @retry_with_backoff(max_retries=3)
+    async def acreate_production_plan(self, user_brief: str) -> ProductionPlan:
+        """Async variant of create_production_plan"""
+        
+        return await self._arun(self._plan_steps(user_brief))
+    
+    def _plan_steps(self, user_brief: str) -> Generator[Dict[str, Any], str, ProductionPlan]:
+        """Plan creation, yielding each Groq request and receiving its reply"""
+        
         self.logger.info("Creating production plan from user brief")
         
-        system_prompt = """
-        You are an AI Video Director creating professional video content. Analyze the user's brief and create a comprehensive production plan.
-
-        Return a JSON object with this EXACT structure:
-        {
-          "title": "Video title",
-          "theme": {
-            "visual_style": "cinematic/documentary/corporate/artistic",
-            "color_palette": ["#color1", "#color2", "#color3"],
-            "mood": "energetic/calm/dramatic/educational",
-            "lighting": "natural/dramatic/soft/bright",
-            "art_style": "realistic/stylized/animated"
-          },
-          "script": "Full voiceover script with <break time='1.5s'/> SSML tags for natural pauses",
-          "characters": [
-            {
-              "name": "character_name",
-              "description": "detailed visual description for consistency (age, appearance, clothing, style)",
-              "visual_style": "professional/casual/animated",
-              "personality": "confident/friendly/authoritative"
-            }
-          ],
-          "scenes": [
-            {
-              "id": "scene_1",
-              "description": "detailed visual description of what happens in this scene",
-              "script_segment": "part of script for this scene",
-              "duration_estimate": 5.0,
-              "visual_type": "character/broll/talking_avatar/static",
-              "characters": ["character_name1", "character_name2"],
-              "mood": "scene mood",
-              "camera_angle": "close/medium/wide/overhead"
-            }
-          ]
-        }
-
-        Guidelines:
-        - Use SSML <break time="1.5s"/> tags for natural pauses in script
-        - Each scene should be 3-8 seconds for good pacing
-        - Mix visual types for engagement
-        - Ensure character descriptions are detailed for visual consistency
-        - Script should be conversational and engaging
-        - List all characters that appear in each scene in the "characters" array
-        """
+        cache_path = self._plan_cache_path(user_brief)
+        cached_plan = self._load_cached_plan(cache_path)
+        if cached_plan is not None:
+            return cached_plan
         
         try:
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": f"Create a video production plan for: {user_brief}"}
-                ],
-                temperature=0.7,
-                max_tokens=4000
-            )
-            
-            content = response.choices[0].message.content
-            self.logger.debug(f"Groq response: {content}")
-
-            if content.startswith("```json"):
-                content = content[7:]  # Remove ```json
-                if content.endswith("```"):
-                    content = content[:-3] # Remove trailing ```
-            
-            # Parse JSON response
-            plan_data = json.loads(content)
-            
-            # Create ProductionPlan object
-            project_id = str(uuid.uuid4())
-            
-            production_plan = ProductionPlan(
-                project_id=project_id,
-                title=plan_data["title"],
-                theme=Theme(**plan_data["theme"]),
-                script=plan_data["script"],
-                characters=[Character(**char) for char in plan_data["characters"]],
-                scenes=[Scene(**scene) for scene in plan_data["scenes"]],
-                created_at=datetime.now().isoformat()
-            )
-            
-            self.logger.info(f"Created production plan with {len(production_plan.scenes)} scenes")
+            request = self._plan_request(user_brief)
+            content = yield request
+            production_plan = self._parse_production_plan(content)
+            self.llm_cache.set(request, content)
+            self._store_cached_plan(production_plan, cache_path)
             return production_plan
             
         except json.JSONDecodeError as e:
@@ -113,137 +228,336 @@ class AIDirector:
             self.logger.error(f"Error creating production plan: {e}")
             raise
     
-    @retry_with_backoff(max_retries=3)
-    def refine_plan_with_audio_rhythm(self, production_plan: ProductionPlan, rhythm_map: Dict[str, Any]) -> ProductionPlan:
-        """Phase 2: Refine plan based on actual audio rhythm analysis"""
+    def _run(self, steps: Generator[Dict[str, Any], str, Any]) -> Any:
+        """Drive a step generator, answering each request with a blocking Groq call"""
         
-        self.logger.info("Refining production plan with audio rhythm analysis")
+        reply, error = None, None
+        while True:
+            try:
+                request = steps.throw(error) if error is not None else steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            try:
+                reply, error = self._complete(request), None
+            except Exception as e:
+                reply, error = None, e
+    
+    async def _arun(self, steps: Generator[Dict[str, Any], str, Any]) -> Any:
+        """Async variant of _run"""
         
-        # Extract only essential timing data to reduce token usage
-        scenes_summary = []
-        for scene in production_plan.scenes:
-            scenes_summary.append({
-                "id": scene.id,
-                "duration_estimate": scene.duration_estimate,
-                "description": scene.description[:100] + "..." if len(scene.description) > 100 else scene.description,
-                "script_segment": scene.script_segment[:200] + "..." if len(scene.script_segment) > 200 else scene.script_segment,
-                "visual_type": scene.visual_type,
-                "characters": scene.characters,
-                "mood": scene.mood,
-                "camera_angle": scene.camera_angle
-            })
-        
-        # Extract only key timing information from rhythm map
-        rhythm_summary = {
-            "duration": rhythm_map.get("duration", 0),
-            "tempo": rhythm_map.get("tempo", 120),
-            "natural_breaks": [
-                {"start": br["start"], "end": br["end"], "duration": br["duration"], "type": br["type"]}
-                for br in rhythm_map.get("natural_breaks", [])[:10]
-            ],
-            "emphasis_points": [
-                {"timestamp": ep["timestamp"], "intensity": ep["intensity"]}
-                for ep in rhythm_map.get("emphasis_points", [])[:10]
-            ],
-            "pacing_style": rhythm_map.get("pacing_recommendations", {}).get("pacing_style", "steady"),
-            "avg_scene_duration": rhythm_map.get("pacing_recommendations", {}).get("avg_scene_duration", 5.0)
-        }
+        reply, error = None, None
+        while True:
+            try:
+                request = steps.throw(error) if error is not None else steps.send(reply)
+            except StopIteration as done:
+                return done.value
+            try:
+                reply, error = await self._acomplete(request), None
+            except Exception as e:
+                reply, error = None, e
+    
+    async def acreate_production_plan_stream(self, user_brief: str) -> AsyncIterator[Union[Scene, ProductionPlan]]:
+        """Stream plan creation, yielding each Scene as soon as the model finishes it
         
-        # Build prompt without f-strings to avoid format conflicts
-        scenes_json = json.dumps(scenes_summary, indent=1)
-        breaks_json = json.dumps(rhythm_summary['natural_breaks'][:5], indent=1)
-        emphasis_json = json.dumps(rhythm_summary['emphasis_points'][:5], indent=1)
+        The last item yielded is the complete ProductionPlan.
+        """
         
-        duration_str = str(round(rhythm_summary['duration'], 1))
-        tempo_str = str(round(rhythm_summary['tempo'], 1))
-        avg_duration_str = str(rhythm_summary['avg_scene_duration'])
+        self.logger.info("Streaming production plan from user brief")
         
-        refinement_prompt = """Refine video scene timings based on audio analysis.
-
-Current Scenes (""" + str(len(scenes_summary)) + """ total):
-""" + scenes_json + """
-
-Audio Analysis:
-- Total Duration: """ + duration_str + """s
-- Tempo: """ + tempo_str + """ BPM
-- Pacing Style: """ + rhythm_summary['pacing_style'] + """
-- Recommended Scene Duration: """ + avg_duration_str + """s
-
-Key Natural Breaks:
-""" + breaks_json + """
-
-Key Emphasis Points:
-""" + emphasis_json + """
-
-Update scene timings to sync with audio rhythm. Calculate start_time and end_time for each scene based on:
-- Natural speech breaks for scene transitions
-- Emphasis points for visual highlights
-- Overall audio duration and pacing
-
-Return updated scenes JSON array with timing info only:
-[
-  {
-    "id": "scene_id",
-    "start_time": 0.0,
-    "end_time": 5.0,
-    "duration": 5.0
-  }
-]
-
-Only include id, start_time, end_time, and duration for each scene."""
+        # Groq's JSON mode can't be combined with streaming; the parser copes with stray text
+        request = {**self._plan_request(user_brief), "stream": True}
+        request.pop("response_format")
+        parser = _SceneStreamParser()
         
         try:
-            response = self.groq_client.chat.completions.create(
-                model="llama-3.3-70b-versatile",
-                messages=[
-                    {"role": "system", "content": "You are an expert video editor syncing visuals to audio rhythm. Return only JSON with timing data."},
-                    {"role": "user", "content": refinement_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=3000
-            )
-            
-            content = response.choices[0].message.content
+            stream = await self.async_groq_client.chat.completions.create(**request)
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    for scene_data in parser.feed(delta):
+                        yield Scene(**scene_data)
             
-            # Clean response if it has code blocks
-            if content.startswith("```json"):
-                content = content[7:]
-                if content.endswith("```"):
-                    content = content[:-3]
-            elif content.startswith("```"):
-                content = content[3:]
-                if content.endswith("```"):
-                    content = content[:-3]
+            yield self._parse_production_plan(parser.buffer)
             
-            updated_scenes_data = json.loads(content.strip())
-            
-            # Update scenes in production plan with new timing
-            updated_scenes = []
-            for i, scene_data in enumerate(updated_scenes_data):
-                # Get original scene data
-                original_scene = production_plan.scenes[i] if i < len(production_plan.scenes) else production_plan.scenes[0]
+        except Exception as e:
+            self.logger.error(f"Error streaming production plan: {e}")
+            raise
+    
+    def _plan_cache_path(self, user_brief: str) -> Path:
+        """Plan cache file for a brief under the current model and system prompt"""
+        
+        key = hashlib.sha256(
+            "\0".join((user_brief, self.settings.llm.plan_model, SYSTEM_PROMPT_PLAN)).encode()
+        ).hexdigest()
+        return self.plan_cache_dir / f"{key}.json"
+    
+    def _load_cached_plan(self, cache_path: Path) -> Optional[ProductionPlan]:
+        """Reuse a saved plan for the same brief if plan caching is on and it's fresh"""
+        
+        if self.settings.plan_cache_ttl <= 0 or not cache_path.exists():
+            return None
+        if time.time() - cache_path.stat().st_mtime > self.settings.plan_cache_ttl:
+            return None
+        
+        try:
+            production_plan = ProductionPlan.load(cache_path)
+        except Exception as e:
+            # A damaged cache file is a miss; drop it so the next plan replaces it
+            self.logger.warning(f"Discarding unreadable cached plan {cache_path}: {e}")
+            cache_path.unlink(missing_ok=True)
+            return None
+        
+        production_plan.project_id = uuid.uuid4().hex  # Each run is still its own project
+        self.logger.info(f"Reusing cached production plan with {len(production_plan.scenes)} scenes")
+        return production_plan
+    
+    def _store_cached_plan(self, production_plan: ProductionPlan, cache_path: Path) -> None:
+        if self.settings.plan_cache_ttl > 0:
+            # Write beside the target and rename, so readers never see a partial file
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+            try:
+                production_plan.save(temp_path)
+                os.replace(temp_path, cache_path)
+            finally:
+                temp_path.unlink(missing_ok=True)
+    
+    def _complete(self, request: Dict[str, Any]) -> str:
+        """Run a chat completion, serving repeated deterministic requests from the cache"""
+        
+        cached = self.llm_cache.get(request)
+        if cached is not None:
+            self.logger.info("Groq reply served from cache")
+            return cached
+        
+        response = self.groq_client.chat.completions.create(**request)
+        self._log_usage(request, response)
+        return response.choices[0].message.content
+    
+    async def _acomplete(self, request: Dict[str, Any]) -> str:
+        """Async variant of _complete"""
+        
+        cached = self.llm_cache.get(request)
+        if cached is not None:
+            self.logger.info("Groq reply served from cache")
+            return cached
+        
+        response = await self.async_groq_client.chat.completions.create(**request)
+        self._log_usage(request, response)
+        return response.choices[0].message.content
+    
+    def _log_usage(self, request: Dict[str, Any], response: Any) -> None:
+        """Log prefix-cache hits and warn when a reply was cut off by max_tokens"""
+        
+        usage = getattr(response, "usage", None)
+        if response.choices and response.choices[0].finish_reason == "length":
+            completion_tokens = getattr(usage, "completion_tokens", None)
+            self.logger.warning(f"Groq reply hit max_tokens={request.get('max_tokens')} (completion_tokens={completion_tokens})")
+        
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None)
+        if usage is not None and cached_tokens is not None:
+            self.logger.info(f"groq_cache hit={cached_tokens}/{usage.prompt_tokens}")
+    
+    def _plan_request(self, user_brief: str) -> Dict[str, Any]:
+        """Groq chat completion arguments for the production plan"""
+        
+        return {
+            "model": self.settings.llm.plan_model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT_PLAN},
+                {"role": "user", "content": f"Create a video production plan for: {user_brief}"}
+            ],
+            "temperature": 0.0 if self.settings.deterministic else 0.7,
+            "max_tokens": _PLAN_MAX_TOKENS,
+            "response_format": _JSON_MODE
+        }
+    
+    def _parse_production_plan(self, content: str) -> ProductionPlan:
+        """Build a ProductionPlan from the model's JSON reply"""
+        
+        self.logger.debug("Groq response: %s", content)
+        
+        # Parse JSON response
+        plan_data = _parse_json_reply(content)
+        
+        # Create ProductionPlan object
+        project_id = uuid.uuid4().hex
+        
+        production_plan = ProductionPlan(
+            project_id=project_id,
+            title=plan_data["title"],
+            theme=Theme(**plan_data["theme"]),
+            script=plan_data["script"],
+            characters=[Character(**char) for char in plan_data["characters"]],
+            scenes=[Scene(**scene) for scene in plan_data["scenes"]],
+            created_at=datetime.now().isoformat()
+        )
+        
+        self.logger.info(f"Created production plan with {len(production_plan.scenes)} scenes")
+        return production_plan
+    
+    @retry_with_backoff(max_retries=3)
+    def refine_plan_with_audio_rhythm(self, production_plan: ProductionPlan, rhythm_map: Dict[str, Any]) -> ProductionPlan:
+        """Phase 2: Refine plan based on actual audio rhythm analysis"""
+        
+        return self._run(self._refinement_steps(production_plan, rhythm_map))
+    
+    @retry_with_backoff(max_retries=3)
+    async def arefine_plan_with_audio_rhythm(self, production_plan: ProductionPlan, rhythm_map: Dict[str, Any]) -> ProductionPlan:
+        """Async variant of refine_plan_with_audio_rhythm"""
+        
+        return await self._arun(self._refinement_steps(production_plan, rhythm_map))
+    
+    def _refinement_steps(self, production_plan: ProductionPlan,
+                          rhythm_map: Dict[str, Any]) -> Generator[Dict[str, Any], str, ProductionPlan]:
+        """Plan refinement, yielding each Groq request and receiving its reply"""
+        
+        self.logger.info("Refining production plan with audio rhythm analysis")
+        
+        solved_plan = self._solve_locally(production_plan, rhythm_map)
+        if solved_plan is not None:
+            return solved_plan
+        
+        try:
+            request = self._refinement_request(production_plan, rhythm_map)
+            models = self._refinement_models()
+            for attempt, model in enumerate(models):
+                request = {**request, "model": model}
+                content = yield request
+                try:
+                    refined_plan = self._apply_refinement(production_plan, rhythm_map, content)
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    if attempt == len(models) - 1:
+                        raise
+                    self.logger.warning(f"{model} returned unusable timings ({e}), retrying on {models[attempt + 1]}")
+                    continue
                 
-                # Create updated scene with new timing but original content
-                scene = Scene(
-                    id=scene_data.get("id", original_scene.id),
-                    start_time=float(scene_data.get("start_time", 0)),
-                    end_time=float(scene_data.get("end_time", 5)),
-                    duration_estimate=float(scene_data.get("duration", scene_data.get("end_time", 5) - scene_data.get("start_time", 0))),
-                    description=original_scene.description,
-                    script_segment=original_scene.script_segment,
-                    visual_type=original_scene.visual_type,
-                    characters=original_scene.characters,
-                    mood=original_scene.mood,
-                    camera_angle=original_scene.camera_angle
-                )
-                updated_scenes.append(scene)
-            
-            production_plan.scenes = updated_scenes
-            production_plan.total_duration = rhythm_map.get("duration", 0.0)
-            
-            self.logger.info("Production plan refined with audio rhythm")
-            return production_plan
+                self.llm_cache.set(request, content)
+                return refined_plan
             
         except Exception as e:
             self.logger.error(f"Error refining plan with audio rhythm: {e}")
-            raise
\ No newline at end of file
+            raise
+    
+    async def arefine_many(self, plans: List[ProductionPlan], rhythm_maps: List[Dict[str, Any]],
+                           concurrency: int = 10) -> List[ProductionPlan]:
+        """Refine several plans concurrently, at most ``concurrency`` Groq requests in flight"""
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def refine(plan: ProductionPlan, rhythm_map: Dict[str, Any]) -> ProductionPlan:
+            async with semaphore:
+                return await self.arefine_plan_with_audio_rhythm(plan, rhythm_map)
+        
+        return await asyncio.gather(*(refine(plan, rhythm_map) for plan, rhythm_map in zip(plans, rhythm_maps)))
+    
+    async def run_pipeline(self, user_brief: str, audio_path: Path,
+                           audio_analyzer: "AudioAnalyzer") -> Tuple[ProductionPlan, Dict[str, Any]]:
+        """Plan and analyse existing audio concurrently, then refine the plan to its rhythm
+        
+        Returns the refined plan and the rhythm map it was timed against.
+        """
+        
+        production_plan, rhythm_map = await asyncio.gather(
+            self.acreate_production_plan(user_brief),
+            asyncio.to_thread(audio_analyzer.create_rhythm_map, audio_path)
+        )
+        
+        refined_plan = await self.arefine_plan_with_audio_rhythm(production_plan, rhythm_map)
+        return refined_plan, rhythm_map
+    
+    def _solve_locally(self, production_plan: ProductionPlan, rhythm_map: Dict[str, Any]) -> Optional[ProductionPlan]:
+        """Time scenes with the deterministic solver; None means ask the LLM instead"""
+        
+        timings = solve_timings(production_plan.scenes, rhythm_map)
+        if timings is None:
+            self.logger.info("Rhythm solver found no layout, falling back to LLM refinement")
+            return None
+        
+        scenes_data = [
+            {"id": scene.id, "start_time": start, "end_time": end, "duration": end - start}
+            for scene, (start, end) in zip(production_plan.scenes, timings)
+        ]
+        return self._set_scene_timings(production_plan, rhythm_map, scenes_data)
+    
+    def _refinement_models(self) -> List[str]:
+        """Refinement model first, then the plan model as a fallback for malformed replies"""
+        
+        return list(dict.fromkeys((self.settings.llm.refinement_model, self.settings.llm.plan_model)))
+    
+    def _refinement_request(self, production_plan: ProductionPlan, rhythm_map: Dict[str, Any]) -> Dict[str, Any]:
+        """Groq chat completion arguments for the rhythm refinement"""
+        
+        # Timing is all the model decides, so send only ids, durations and event times
+        scenes_csv = "\n".join(
+            ["id,dur"] + [f"{scene.id},{scene.duration_estimate:.1f}" for scene in production_plan.scenes]
+        )
+        break_starts = np.asarray(rhythm_map.get("natural_breaks", {}).get("start", []), dtype=np.float64)
+        emphasis_times = np.asarray(rhythm_map.get("emphasis_points", {}).get("timestamp", []), dtype=np.float64)
+        breaks_csv = ",".join(f"{t:.2f}" for t in break_starts[:_MAX_PROMPT_EVENTS].tolist())
+        emphasis_csv = ",".join(f"{t:.2f}" for t in emphasis_times[:_MAX_PROMPT_EVENTS].tolist())
+        
+        pacing = rhythm_map.get("pacing_recommendations", {})
+        duration_str = str(round(rhythm_map.get("duration", 0), 1))
+        avg_duration_str = str(pacing.get("avg_scene_duration", 5.0))
+        
+        refinement_prompt = """Scenes:
+""" + scenes_csv + """
+
+Audio: """ + duration_str + """s, pacing """ + pacing.get("pacing_style", "steady") + """, target scene """ + avg_duration_str + """s
+Breaks: """ + breaks_csv + """
+Emphasis: """ + emphasis_csv + """
+
+Set start_time and end_time for every scene, cutting on breaks and covering the whole audio.
+Return JSON: {"scenes": [{"id": "scene_1", "start_time": 0.0, "end_time": 5.0, "duration": 5.0}]}"""
+        
+        return {
+            "model": self.settings.llm.refinement_model,
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT_REFINE},
+                {"role": "user", "content": refinement_prompt}
+            ],
+            "temperature": 0.0 if self.settings.deterministic else 0.3,
+            "max_tokens": max(
+                _REFINE_MIN_TOKENS,
+                _REFINE_BASE_TOKENS + _REFINE_TOKENS_PER_SCENE * len(production_plan.scenes)
+            ),
+            "response_format": _JSON_MODE
+        }
+    
+    def _apply_refinement(self, production_plan: ProductionPlan, rhythm_map: Dict[str, Any], content: str) -> ProductionPlan:
+        """Apply the model's timing reply to the plan's scenes"""
+        
+        return self._set_scene_timings(production_plan, rhythm_map, _parse_json_reply(content)["scenes"])
+    
+    def _set_scene_timings(self, production_plan: ProductionPlan, rhythm_map: Dict[str, Any],
+                           updated_scenes_data: List[Dict[str, Any]]) -> ProductionPlan:
+        """Rebuild the plan's scenes with new timings, keeping their content"""
+        
+        # Update scenes in production plan with new timing
+        updated_scenes = []
+        for i, scene_data in enumerate(updated_scenes_data):
+            # Get original scene data
+            original_scene = production_plan.scenes[i] if i < len(production_plan.scenes) else production_plan.scenes[0]
+            
+            # Create updated scene with new timing but original content
+            scene = Scene(
+                id=scene_data.get("id", original_scene.id),
+                start_time=float(scene_data.get("start_time", 0)),
+                end_time=float(scene_data.get("end_time", 5)),
+                duration_estimate=float(scene_data.get("duration", scene_data.get("end_time", 5) - scene_data.get("start_time", 0))),
+                description=original_scene.description,
+                script_segment=original_scene.script_segment,
+                visual_type=original_scene.visual_type,
+                characters=original_scene.characters,
+                mood=original_scene.mood,
+                camera_angle=original_scene.camera_angle
+            )
+            updated_scenes.append(scene)
+        
+        production_plan.scenes = updated_scenes
+        production_plan.total_duration = rhythm_map.get("duration", 0.0)
+        
+        self.logger.info("Production plan refined with audio rhythm")
+        return production_plan
\ No newline at end of file
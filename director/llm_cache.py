@@ -0,0 +1,31 @@
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from utils.result_cache import ResultCache
+
+class LLMCache:
+    """Exact-match cache of chat completion replies
+    
+    Only deterministic requests (temperature 0) are cached; sampling at a
+    higher temperature is expected to give a different answer each time.
+    """
+    
+    def __init__(self, db_path: Path, ttl: float = 7 * 24 * 3600):
+        self._store = ResultCache(db_path, default_ttl=ttl)
+    
+    @staticmethod
+    def cacheable(request: Dict[str, Any]) -> bool:
+        return request.get("temperature", 1.0) == 0
+    
+    def get(self, request: Dict[str, Any]) -> Optional[str]:
+        """Cached reply for an identical request, if any"""
+        
+        if not self.cacheable(request):
+            return None
+        return self._store.get(ResultCache.make_key("chat", request))
+    
+    def set(self, request: Dict[str, Any], content: str) -> None:
+        """Remember a reply that parsed successfully"""
+        
+        if self.cacheable(request):
+            self._store.set(ResultCache.make_key("chat", request), content)
@@ -1,9 +1,13 @@
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field, fields
 from typing import List, Dict, Any, Optional
-import json
+import orjson
 from pathlib import Path
 
-@dataclass
+def _shallow_dict(obj: Any) -> Dict[str, Any]:
+    """Public field values of a dataclass, without asdict's recursive deep copy"""
+    return {f.name: getattr(obj, f.name) for f in fields(obj) if not f.name.startswith("_")}
+
+@dataclass(slots=True)
 class Character:
     name: str
     description: str
@@ -12,7 +16,7 @@ class Character:
     reference_image_url: Optional[str] = None
     gcs_image_url: Optional[str] = None  # Google Cloud Storage URL
 
-@dataclass
+@dataclass(slots=True)
 class Scene:
     id: str
     description: str
@@ -29,7 +33,7 @@ class Scene:
         if self.characters is None:
             self.characters = []
 
-@dataclass
+@dataclass(slots=True)
 class Theme:
     visual_style: str
     color_palette: List[str]
@@ -37,7 +41,7 @@ class Theme:
     lighting: str = "natural"
     art_style: str = "realistic"
 
-@dataclass
+@dataclass(slots=True)
 class ProductionPlan:
     project_id: str
     title: str
@@ -48,9 +52,33 @@ class ProductionPlan:
     total_duration: float = 0.0
     created_at: str = ""
     
+    # Lookup tables built on first use; dropped whenever scenes/characters are reassigned
+    _scene_index: Optional[Dict[str, Scene]] = field(default=None, init=False, repr=False, compare=False)
+    _char_index: Optional[Dict[str, Character]] = field(default=None, init=False, repr=False, compare=False)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        object.__setattr__(self, name, value)
+        if name in ("scenes", "characters"):
+            object.__setattr__(self, "_scene_index", None)
+            object.__setattr__(self, "_char_index", None)
+    
+    def _ensure_indexes(self) -> None:
+        """Build id -> Scene and name -> Character maps if they are stale"""
+        if self._scene_index is None or self._char_index is None:
+            object.__setattr__(self, "_scene_index", {scene.id: scene for scene in self.scenes})
+            object.__setattr__(self, "_char_index", {char.name: char for char in self.characters})
+    
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary for JSON serialization"""
-        return asdict(self)
+        """Convert to dictionary for JSON serialization
+        
+        Nested lists are shared with the plan, not copied; treat the result
+        as read-only.
+        """
+        data = _shallow_dict(self)
+        data["theme"] = _shallow_dict(self.theme)
+        data["scenes"] = [_shallow_dict(scene) for scene in self.scenes]
+        data["characters"] = [_shallow_dict(char) for char in self.characters]
+        return data
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'ProductionPlan':
@@ -73,20 +101,21 @@ class ProductionPlan:
     
     def save(self, filepath: Path) -> None:
         """Save production plan to file"""
-        with open(filepath, 'w') as f:
-            json.dump(self.to_dict(), f, indent=2)
+        filepath.write_bytes(
+            orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY)
+        )
     
     @classmethod
     def load(cls, filepath: Path) -> 'ProductionPlan':
         """Load production plan from file"""
-        with open(filepath, 'r') as f:
-            data = json.load(f)
+        data = orjson.loads(filepath.read_bytes())
         return cls.from_dict(data)
     
     def get_characters_for_scene(self, scene_id: str) -> List[Character]:
-        """Get character objects for a specific scene"""
-        scene = next((s for s in self.scenes if s.id == scene_id), None)
+        """Get character objects for a specific scene, in the scene's listed order"""
+        self._ensure_indexes()
+        scene = self._scene_index.get(scene_id)
         if not scene or not scene.characters:
             return []
         
-        return [char for char in self.characters if char.name in scene.characters]
\ No newline at end of file
+        return [self._char_index[name] for name in scene.characters if name in self._char_index]
\ No newline at end of file
@@ -0,0 +1,47 @@
+import numpy as np
+from typing import Any, Dict, List, Optional, Tuple
+
+from director.production_plan import Scene
+
+# Scenes shorter than this after snapping mean the solve went wrong
+MIN_SCENE_DURATION = 0.5
+
+def solve_timings(scenes: List[Scene], rhythm_map: Dict[str, Any]) -> Optional[List[Tuple[float, float]]]:
+    """Place scenes on the audio timeline without an LLM
+    
+    Scales the scenes' duration estimates to fill the audio, then snaps each
+    interior boundary to the nearest natural break within half the
+    recommended scene length. Returns (start_time, end_time) per scene, or
+    None when no sensible layout exists and the caller should fall back.
+    """
+    
+    duration = float(rhythm_map.get("duration", 0.0))
+    if not scenes or duration <= 0:
+        return None
+    
+    estimates = np.array([max(scene.duration_estimate or 0.0, 0.0) for scene in scenes], dtype=np.float64)
+    if estimates.sum() <= 0:
+        return None
+    
+    boundaries = np.cumsum(estimates / estimates.sum() * duration)[:-1]
+    
+    breaks = np.sort(np.asarray(rhythm_map.get("natural_breaks", {}).get("start", []), dtype=np.float64))
+    if breaks.size and boundaries.size:
+        avg_scene_duration = rhythm_map.get("pacing_recommendations", {}).get("avg_scene_duration", duration / len(scenes))
+        tolerance = 0.5 * avg_scene_duration
+        
+        # Nearest break on either side of each boundary, O(log B) per scene
+        right = np.searchsorted(breaks, boundaries).clip(max=breaks.size - 1)
+        left = (right - 1).clip(min=0)
+        nearest = np.where(
+            np.abs(breaks[left] - boundaries) <= np.abs(breaks[right] - boundaries),
+            breaks[left],
+            breaks[right]
+        )
+        boundaries = np.where(np.abs(nearest - boundaries) <= tolerance, nearest, boundaries)
+    
+    edges = np.concatenate(([0.0], boundaries, [duration]))
+    if np.any(np.diff(edges) < MIN_SCENE_DURATION):
+        return None
+    
+    return list(zip(edges[:-1].tolist(), edges[1:].tolist()))
@@ -1,19 +1,20 @@
 import asyncio
-import json
 import uuid
+import ffmpeg
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 from config.settings import load_settings
 from utils.logger import setup_logger
+from utils.helpers import save_json
 from director.ai_director import AIDirector
-from director.production_plan import ProductionPlan
+from director.production_plan import Character, ProductionPlan, Scene
 from crew.voice_actor import VoiceActor
 from crew.character_designer import CharacterDesigner
 from crew.visual_artist import VisualArtist
 from crew.music_composer import MusicComposer
-from analysis.audio_analyzer import AudioAnalyzer
+from analysis.audio_analyzer import AudioAnalyzer, rhythm_map_to_records
 from assembly.video_assembler import VideoAssembler
 from storage.media_manager import MediaManager
 
@@ -38,8 +39,9 @@ class AIVideoDirectorPipeline:
         self.media_manager = MediaManager()
         
         # Project state
-        self.project_id = str(uuid.uuid4())
+        self.project_id = uuid.uuid4().hex
         self.production_plan: Optional[ProductionPlan] = None
+        self.voiceover_path: Optional[Path] = None
         self.media_assets = {
             "audio": {},
             "images": {},
@@ -47,6 +49,7 @@ class AIVideoDirectorPipeline:
             "music": {},
             "characters": {}
         }
+        self.failed_scenes: Dict[str, str] = {}
         
         # Create project directories
         self.project_folders = self.media_manager.organize_project_assets(self.project_id)
@@ -61,8 +64,19 @@ class AIVideoDirectorPipeline:
             # Phase 1: Pre-Production & Asset Design
             await self._phase_1_preproduction(user_brief)
             
-            # Phase 2: Audio-Driven Scene Timing
-            await self._phase_2_audio_timing()
+            # Phase 2: Audio-Driven Scene Timing. Character references only
+            # need the plan, so they are designed while the audio is produced;
+            # if either branch fails the other is cancelled
+            try:
+                async with asyncio.TaskGroup() as group:
+                    group.create_task(self._create_character_references())
+                    group.create_task(self._phase_2_audio_timing())
+            except ExceptionGroup as e:
+                raise e.exceptions[0]
+            
+            # Save updated production plan, now with timings and character URLs
+            updated_plan_path = self.settings.temp_dir / f"production_plan_updated_{self.project_id}.json"
+            self.production_plan.save(updated_plan_path)
             
             # Phase 3: Multi-Modal Media Generation
             await self._phase_3_media_generation()
@@ -87,31 +101,51 @@ class AIVideoDirectorPipeline:
         
         # Step 1 & 2: Create production plan
         self.logger.info("Creating production plan...")
-        self.production_plan = self.director.create_production_plan(user_brief)
+        self.production_plan = await self.director.acreate_production_plan(user_brief)
         
-        # Save production plan
-        plan_path = self.settings.temp_dir / f"production_plan_{self.project_id}.json"
-        self.production_plan.save(plan_path)
+        # Save the pre-refinement plan as a debug artifact; the refined plan is always saved
+        if self.settings.debug:
+            plan_path = self.settings.temp_dir / f"production_plan_{self.project_id}.json"
+            self.production_plan.save(plan_path)
+    
+    async def _create_character_references(self):
+        """Phase 1 (asset design): character reference images"""
         
-        # Step 3: Create character references using OpenAI DALL-E 3
+        # Step 3: Create character references using OpenAI DALL-E 3. Each
+        # character is generated and uploaded independently of the others
         self.logger.info("Creating character reference images with OpenAI DALL-E 3...")
-        for character in self.production_plan.characters:
-            # Generate character reference image
-            character_image_path = self.character_designer.create_character_reference(character)
+        semaphore = asyncio.Semaphore(self.settings.max_concurrency)
+        results = await asyncio.gather(*(
+            self._make_character(character, semaphore)
+            for character in self.production_plan.characters
+        ))
+        
+        for name, gcs_url in results:
+            self.media_assets["characters"][name] = gcs_url
+    
+    async def _make_character(self, character: Character, semaphore: asyncio.Semaphore) -> Tuple[str, str]:
+        """Create and store one character reference, returning (name, GCS URL)"""
+        
+        async with semaphore:
+            character_image_path = await asyncio.to_thread(
+                self.character_designer.create_character_reference,
+                character
+            )
             
             # Store in Google Cloud Storage
-            gcs_url = self.media_manager.store_character_reference(
+            gcs_url = await asyncio.to_thread(
+                self.media_manager.store_character_reference,
                 character.name,
                 character_image_path,
                 self.project_id
             )
-            
-            # Update character with URLs as strings (not Path objects)
-            character.reference_image_url = str(character_image_path)  # Convert Path to string
-            character.gcs_image_url = gcs_url
-            self.media_assets["characters"][character.name] = gcs_url
-            
-            self.logger.info(f"Character reference created and stored for {character.name}")
+        
+        # Update character with URLs as strings (not Path objects)
+        character.reference_image_url = str(character_image_path)  # Convert Path to string
+        character.gcs_image_url = gcs_url
+        
+        self.logger.info(f"Character reference created and stored for {character.name}")
+        return character.name, gcs_url
     
     async def _phase_2_audio_timing(self):
         """Phase 2: Audio-Driven Scene Timing"""
@@ -120,45 +154,77 @@ class AIVideoDirectorPipeline:
         
         # Step 4: Generate voiceover
         self.logger.info("Generating main voiceover...")
-        audio_path = self.voice_actor.generate_voiceover(
-            self.production_plan.script,
-            output_path=self.settings.temp_dir / f"voiceover_{self.project_id}.mp3"
+        audio_path = await asyncio.to_thread(
+            self.voice_actor.generate_voiceover,
+            self.production_plan.script
         )
+        self.voiceover_path = audio_path
         
-        # Store voiceover in Google Cloud Storage
-        voiceover_gcs_url = self.media_manager.upload_file(
-            audio_path,
-            self.project_folders["audio"] + "main_voiceover.mp3"
+        # Store voiceover in Google Cloud Storage while (Step 5) its rhythm is
+        # analyzed; both only read the audio file
+        self.logger.info("Analyzing audio rhythm and timing...")
+        voiceover_gcs_url, rhythm_map = await asyncio.gather(
+            asyncio.to_thread(
+                self.media_manager.upload_file,
+                audio_path,
+                self.project_folders["audio"] + "main_voiceover.mp3"
+            ),
+            asyncio.to_thread(self.audio_analyzer.create_rhythm_map, audio_path)
         )
         self.media_assets["audio"]["main_voiceover"] = voiceover_gcs_url
         
-        # Step 5: Analyze audio rhythm
-        self.logger.info("Analyzing audio rhythm and timing...")
-        rhythm_map = self.audio_analyzer.create_rhythm_map(audio_path)
-        
-        # Save rhythm analysis
-        rhythm_path = self.settings.temp_dir / f"rhythm_map_{self.project_id}.json"
-        with open(rhythm_path, 'w') as f:
-            json.dump(rhythm_map, f, indent=2)
+        # Save rhythm analysis (debug only; the pipeline uses the in-memory map)
+        if self.settings.debug:
+            rhythm_path = self.settings.temp_dir / f"rhythm_map_{self.project_id}.json"
+            save_json(rhythm_map_to_records(rhythm_map), rhythm_path)
         
         # Step 6: Refine production plan with audio rhythm
         self.logger.info("Refining production plan with audio rhythm...")
-        self.production_plan = self.director.refine_plan_with_audio_rhythm(
+        self.production_plan = await self.director.arefine_plan_with_audio_rhythm(
             self.production_plan,
             rhythm_map
         )
-        
-        # Save updated production plan
-        updated_plan_path = self.settings.temp_dir / f"production_plan_updated_{self.project_id}.json"
-        self.production_plan.save(updated_plan_path)
     
     async def _phase_3_media_generation(self):
         """Phase 3: Multi-Modal Media Generation with Character Consistency"""
         
         self.logger.info("🎨 Phase 3: Multi-Modal Media Generation")
         
-        # Step 7: Generate visual assets for each scene
-        for i, scene in enumerate(self.production_plan.scenes):
+        # Step 7 & 8: scenes are independent of each other and of the music,
+        # so all of them are generated concurrently. Every job runs to
+        # completion even if another fails, so no paid generation is orphaned
+        semaphore = asyncio.Semaphore(self.settings.max_concurrency)
+        *scene_results, music_url = await asyncio.gather(
+            *(
+                self._generate_scene(i, scene, semaphore)
+                for i, scene in enumerate(self.production_plan.scenes)
+            ),
+            self._generate_music(),
+            return_exceptions=True
+        )
+        
+        # Record videos in scene order regardless of completion order
+        for scene, result in zip(self.production_plan.scenes, scene_results):
+            if isinstance(result, BaseException):
+                self.logger.error(f"Scene {scene.id} failed: {result}")
+                self.failed_scenes[scene.id] = str(result)
+            elif result:
+                self.media_assets["videos"][scene.id] = result
+        
+        if isinstance(music_url, BaseException):
+            self.logger.error(f"Background music failed, assembling without it: {music_url}")
+        elif music_url:
+            self.media_assets["music"]["background"] = music_url
+        
+        if self.failed_scenes:
+            if not self.media_assets["videos"]:
+                raise RuntimeError(f"Every scene failed to generate: {self.failed_scenes}")
+            self.logger.warning(f"{len(self.failed_scenes)} scene(s) failed and will be missing: {list(self.failed_scenes)}")
+    
+    async def _generate_scene(self, i: int, scene: Scene, semaphore: asyncio.Semaphore) -> Optional[str]:
+        """Generate and store the video for one scene, returning its stored URL"""
+        
+        async with semaphore:
             self.logger.info(f"Generating visual for scene {i+1}/{len(self.production_plan.scenes)}: {scene.id}")
             
             video_url = None
@@ -169,7 +235,7 @@ class AIVideoDirectorPipeline:
                 
                 if scene_characters:
                     # Generate character scene with references
-                    video_url = self.visual_artist.generate_character_video_with_references(
+                    video_url = await self.visual_artist.generate_character_video_with_references_async(
                         scene_characters,
                         scene.description,
                         scene.end_time - scene.start_time
@@ -183,12 +249,9 @@ class AIVideoDirectorPipeline:
                     character = scene_characters[0]  # Use first character
                     
                     # Create scene-specific audio clip
-                    scene_audio_path = self.voice_actor.generate_voiceover(
-                        scene.script_segment,
-                        output_path=self.settings.temp_dir / f"scene_{scene.id}_audio.mp3"
-                    )
+                    scene_audio_path = await asyncio.to_thread(self._scene_audio, scene)
                     
-                    video_url = self.visual_artist.generate_talking_avatar(
+                    video_url = await self.visual_artist.generate_talking_avatar_async(
                         character,
                         scene_audio_path,
                         scene.end_time - scene.start_time
@@ -196,48 +259,88 @@ class AIVideoDirectorPipeline:
                     
             elif scene.visual_type == "broll":
                 # Generate B-roll video
-                video_url = self.visual_artist.generate_broll_video(
+                video_url = await self.visual_artist.generate_broll_video_async(
                     scene.description,
                     scene.end_time - scene.start_time,
                     scene.mood
                 )
             
-            if video_url:
-                # Store video asset in Google Cloud Storage
-                stored_video_url = self.media_manager.store_scene_asset(
-                    scene.id,
-                    video_url,
-                    self.project_id,
-                    "videos"
-                )
-                self.media_assets["videos"][scene.id] = stored_video_url
-                
-                self.logger.info(f"Scene {scene.id} video generated and stored")
+            if not video_url:
+                return None
+            
+            # Store video asset in Google Cloud Storage
+            stored_video_url = await asyncio.to_thread(
+                self.media_manager.store_scene_asset,
+                scene.id,
+                video_url,
+                self.project_id,
+                "videos"
+            )
+            
+            self.logger.info(f"Scene {scene.id} video generated and stored")
+            return stored_video_url
+    
+    def _scene_audio(self, scene: Scene) -> Path:
+        """Audio for a talking-avatar scene, cut from the main voiceover when possible
+        
+        The cut uses the scene's solved start/end times rather than an alignment
+        of script_segment against the audio, so it is approximate; TTS is used
+        when the line isn't part of the script or ffmpeg fails. Note that
+        generate_talking_avatar does not consume the audio yet (no lip-sync
+        model is wired in), so the clip is only prepared for it.
+        """
+        
+        if self.voiceover_path and scene.script_segment and scene.script_segment in self.production_plan.script:
+            try:
+                return self._slice_voiceover(scene)
+            except (ffmpeg.Error, OSError) as e:
+                self.logger.warning(f"Could not cut audio for scene {scene.id} from the voiceover, using TTS: {e}")
+        
+        return self.voice_actor.generate_voiceover(scene.script_segment)
+    
+    def _slice_voiceover(self, scene: Scene) -> Path:
+        """Copy the scene's time range out of the main voiceover without re-encoding"""
+        
+        output_path = self.settings.temp_dir / f"scene_audio_{self.project_id}_{scene.id}.mp3"
+        (
+            ffmpeg
+            .input(str(self.voiceover_path), ss=scene.start_time, to=scene.end_time)
+            .output(str(output_path), c="copy")
+            .overwrite_output()
+            .run(quiet=True)
+        )
+        return output_path
+    
+    async def _generate_music(self) -> Optional[str]:
+        """Generate and store the background music, returning its stored URL"""
         
-        # Step 8: Generate background music
         self.logger.info("Generating background music...")
-        music_url = self.music_composer.generate_background_music(
+        music_url = await asyncio.to_thread(
+            self.music_composer.generate_background_music,
             self.production_plan.theme.mood,
             self.production_plan.total_duration,
             "cinematic"
         )
         
-        if music_url and music_url != "https://placeholder-music-url.com":
-            stored_music_url = self.media_manager.store_scene_asset(
-                "background_music",
-                music_url,
-                self.project_id,
-                "music"
-            )
-            self.media_assets["music"]["background"] = stored_music_url
+        if not music_url or music_url == "https://placeholder-music-url.com":
+            return None
+        
+        return await asyncio.to_thread(
+            self.media_manager.store_scene_asset,
+            "background_music",
+            music_url,
+            self.project_id,
+            "music"
+        )
     
     async def _phase_4_final_assembly(self) -> str:
         """Phase 4: Final Assembly"""
         
         self.logger.info("🎬 Phase 4: Final Assembly & Rendering")
         
-        # Step 9: Assemble final video
-        final_video_url = self.video_assembler.assemble_final_video(
+        # Step 9: Assemble final video (render polling runs off the event loop)
+        final_video_url = await asyncio.to_thread(
+            self.video_assembler.assemble_final_video,
             self.production_plan,
             self.media_assets
         )
@@ -255,25 +358,28 @@ class AIVideoDirectorPipeline:
     def _create_project_summary(self, final_video_url: str) -> Dict[str, Any]:
         """Create comprehensive project summary"""
         
+        # One pass over each list; counts come from len()
+        scenes = self.production_plan.scenes
+        scene_types = {scene.visual_type for scene in scenes}
+        character_references = {char.name: char.gcs_image_url for char in self.production_plan.characters}
+        
         return {
             "project_id": self.project_id,
             "title": self.production_plan.title,
             "final_video_url": final_video_url,
             "duration": self.production_plan.total_duration,
             "created_at": datetime.now().isoformat(),
-            "scenes_count": len(self.production_plan.scenes),
+            "scenes_count": len(scenes),
             "characters_count": len(self.production_plan.characters),
             "theme": self.production_plan.theme.mood,
             "visual_style": self.production_plan.theme.visual_style,
             "media_assets": self.media_assets,
-            "character_references": {
-                char.name: char.gcs_image_url 
-                for char in self.production_plan.characters
-            },
+            "failed_scenes": self.failed_scenes,
+            "character_references": character_references,
             "production_plan_summary": {
-                "total_scenes": len(self.production_plan.scenes),
-                "scene_types": {scene.visual_type for scene in self.production_plan.scenes},
-                "characters": [char.name for char in self.production_plan.characters]
+                "total_scenes": len(scenes),
+                "scene_types": scene_types,
+                "characters": list(character_references)
             },
             "storage_info": {
                 "gcs_bucket": self.settings.storage.gcp_bucket,
@@ -1,18 +1,70 @@
+import base64
+import hashlib
 import os
+import tempfile
+import types
+from datetime import timedelta
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Optional, Union
+from typing import Mapping, Optional, Tuple, Union
 from google.cloud import storage
-from urllib.parse import urlparse
-import requests
-import tempfile
+from google.cloud.storage import transfer_manager
+from google.cloud.storage.retry import DEFAULT_RETRY
+from urllib.parse import unquote, urlparse
 
 from config.settings import load_settings
 from utils.logger import setup_logger
-from utils.helpers import retry_with_backoff
+from utils.helpers import DOWNLOAD_CHUNK_SIZE, DOWNLOAD_TIMEOUT, shared_session
+from utils.result_cache import ResultCache
+
+# Objects above this size (e.g. the final render) are uploaded as parallel parts
+_PARALLEL_UPLOAD_THRESHOLD = 32 * 1024 * 1024
+_PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+_PARALLEL_WORKERS = 8
+
+# Bucket IAM roles that let anonymous users read objects in "public" URL mode
+_PUBLIC_READ_ROLES = frozenset({"roles/storage.objectViewer", "roles/storage.legacyObjectReader"})
+
+def _gcs_object(url: str) -> Optional[Tuple[str, str]]:
+    """(bucket, object name) when the URL points at a Cloud Storage object, else None"""
+    
+    parsed = urlparse(url)
+    if parsed.hostname == "storage.googleapis.com":
+        bucket, _, name = parsed.path.lstrip("/").partition("/")
+    elif parsed.hostname and parsed.hostname.endswith(".storage.googleapis.com"):
+        bucket, name = parsed.hostname[:-len(".storage.googleapis.com")], parsed.path.lstrip("/")
+    else:
+        return None
+    
+    if not bucket or not name:
+        return None
+    return bucket, unquote(name)
+
+@lru_cache(maxsize=64)
+def _folders_for(project_id: str) -> Mapping[str, str]:
+    """Read-only folder layout for a project, built once per project id"""
+    
+    return types.MappingProxyType({
+        "audio": f"projects/{project_id}/audio/",
+        "images": f"projects/{project_id}/images/",
+        "videos": f"projects/{project_id}/videos/",
+        "music": f"projects/{project_id}/music/",
+        "characters": f"projects/{project_id}/characters/",
+        "final": f"projects/{project_id}/final/",
+        "temp": f"projects/{project_id}/temp/"
+    })
 
 class MediaManager:
     """Handles media storage and organization using Google Cloud Storage"""
     
+    # File extension per stored asset type
+    _EXTENSIONS = types.MappingProxyType({
+        "videos": ".mp4",
+        "images": ".jpg",
+        "music": ".mp3",
+        "final": ".mp4"
+    })
+    
     def __init__(self):
         self.settings = load_settings()
         self.logger = setup_logger("media_manager")
@@ -21,20 +73,43 @@ class MediaManager:
         self.client = storage.Client(project=self.settings.storage.gcp_project)
         self.bucket = self.client.bucket(self.settings.storage.gcp_bucket)
         
-    @retry_with_backoff(max_retries=3)
+        # Fetch the auth token and bucket metadata once, before uploads fan out
+        # and every worker races to do the same
+        try:
+            self.bucket.reload()
+        except Exception as e:
+            self.logger.warning(f"Could not pre-warm GCS bucket {self.bucket.name}: {e}")
+        shared_session()
+        
+        self.url_mode = self._check_url_mode(self.settings.storage.url_mode)
+        
+        # Source URL -> blob name of a previous upload, so re-runs skip the transfer
+        self.url_index = ResultCache(self.settings.cache_dir / "gcs_urls.db")
+        
     def upload_file(self, local_path: Path, remote_path: str) -> str:
         """Upload file to Google Cloud Storage"""
         
         self.logger.info(f"Uploading {local_path} to {remote_path}")
         
+        # Retried at the HTTP layer from the local file, without re-running the whole call
         try:
-            blob = self.bucket.blob(remote_path)
-            blob.upload_from_filename(str(local_path))
+            # Skip the upload when the object already holds these exact bytes
+            local_file = os.fspath(local_path)
+            with open(local_file, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                md5_hash = base64.b64encode(hashlib.file_digest(f, "md5").digest()).decode()
+            existing = self.bucket.get_blob(remote_path)
+            if existing is not None and existing.md5_hash == md5_hash:
+                self.logger.info(f"Unchanged, reusing {remote_path}")
+                return self._object_url(existing)
             
-            # Make file publicly accessible
-            blob.make_public()
+            blob = self.bucket.blob(remote_path)
+            if size > _PARALLEL_UPLOAD_THRESHOLD:
+                self._upload_in_parts(local_path, blob)
+            else:
+                blob.upload_from_filename(local_file, retry=DEFAULT_RETRY)
             
-            public_url = blob.public_url
+            public_url = self._object_url(blob)
             self.logger.info(f"File uploaded successfully: {public_url}")
             
             return public_url
@@ -43,32 +118,53 @@ class MediaManager:
             self.logger.error(f"Error uploading file: {e}")
             raise
     
-    @retry_with_backoff(max_retries=3)
     def upload_from_url(self, url: str, remote_path: str) -> str:
         """Download from URL and upload to Google Cloud Storage"""
         
         self.logger.info(f"Downloading from {url} and uploading to {remote_path}")
         
-        try:
-            # Download file to temporary location
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False) as temp_file:
-                for chunk in response.iter_content(chunk_size=8192):
-                    temp_file.write(chunk)
-                temp_path = temp_file.name
+        # Earlier upload of the same source into this bucket; only trusted while the blob exists
+        index_key = ResultCache.make_key("url", self.bucket.name, url)
+        stored_name = self.url_index.get(index_key)
+        if stored_name is not None and self.bucket.blob(stored_name).exists():
+            if stored_name == remote_path:
+                self.logger.info(f"Already stored as {remote_path}, skipping upload")
+                return self._object_url(self.bucket.blob(remote_path))
             
-            # Upload to GCS
-            blob = self.bucket.blob(remote_path)
-            blob.upload_from_filename(temp_path)
-            blob.make_public()
+            # Another project owns that blob, so give this one its own copy, server-side
+            try:
+                return self._copy_object((self.bucket.name, stored_name), remote_path, index_key)
+            except Exception as e:
+                self.logger.warning(f"Server-side copy of {stored_name} failed, downloading instead: {e}")
+        
+        source = _gcs_object(url)
+        if source is not None:
+            try:
+                return self._copy_object(source, remote_path, index_key)
+            except Exception as e:
+                self.logger.warning(f"Server-side copy of {url} failed, streaming instead: {e}")
+        
+        try:
+            # Spool the body to disk first: a retried upload has to seek back in its
+            # source, which an HTTP response stream can't do
+            with tempfile.TemporaryDirectory() as temp_dir:
+                local_path = Path(temp_dir) / "asset"
+                with shared_session().get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+                    response.raise_for_status()
+                    content_type = response.headers.get("Content-Type")
+                    with open(local_path, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                
+                blob = self.bucket.blob(remote_path)
+                if local_path.stat().st_size > _PARALLEL_UPLOAD_THRESHOLD:
+                    self._upload_in_parts(local_path, blob, content_type)
+                else:
+                    blob.upload_from_filename(str(local_path), content_type=content_type, retry=DEFAULT_RETRY)
             
-            # Clean up temporary file
-            os.unlink(temp_path)
+            self.url_index.set(index_key, remote_path)
             
-            public_url = blob.public_url
+            public_url = self._object_url(blob)
             self.logger.info(f"File uploaded from URL successfully: {public_url}")
             
             return public_url
@@ -81,20 +177,86 @@ class MediaManager:
             self.logger.warning("Falling back to original URL without GCS upload")
             return url
     
-    def organize_project_assets(self, project_id: str) -> Dict[str, str]:
+    def _copy_object(self, source: Tuple[str, str], remote_path: str, index_key: str) -> str:
+        """Copy a Cloud Storage object inside GCS, without the bytes passing through this process"""
+        
+        source_blob = self.client.bucket(source[0]).blob(source[1])
+        blob = self.bucket.blob(remote_path)
+        
+        # Large or cross-location copies complete over several rewrite calls
+        token, _, _ = blob.rewrite(source_blob)
+        while token is not None:
+            token, _, _ = blob.rewrite(source_blob, token=token)
+        
+        self.url_index.set(index_key, remote_path)
+        
+        public_url = self._object_url(blob)
+        self.logger.info(f"Object copied within Cloud Storage: {public_url}")
+        return public_url
+    
+    def _upload_in_parts(self, local_path: Path, blob: storage.Blob, content_type: Optional[str] = None) -> None:
+        """Upload a large file as concurrent XML multipart chunks"""
+        
+        self.logger.info(f"Uploading {local_path.stat().st_size} bytes in {_PARALLEL_CHUNK_SIZE} byte parts")
+        transfer_manager.upload_chunks_concurrently(
+            str(local_path),
+            blob,
+            content_type=content_type,
+            chunk_size=_PARALLEL_CHUNK_SIZE,
+            worker_type=transfer_manager.THREAD,
+            max_workers=_PARALLEL_WORKERS
+        )
+    
+    def _check_url_mode(self, url_mode: str) -> str:
+        """Confirm the bucket can serve the configured URL mode, else fall back to signed URLs
+        
+        "public" mode sets no per-object ACL, so it only works once the bucket
+        IAM policy grants roles/storage.objectViewer to allUsers.
+        """
+        
+        if url_mode not in ("acl", "public", "signed"):
+            raise ValueError(f"Unknown GCS_URL_MODE {url_mode!r}; expected acl, public or signed")
+        if url_mode != "public":
+            return url_mode
+        
+        try:
+            policy = self.bucket.get_iam_policy(requested_policy_version=3)
+            readable = any(
+                binding["role"] in _PUBLIC_READ_ROLES and "allUsers" in binding["members"]
+                for binding in policy.bindings
+            )
+        except Exception as e:
+            self.logger.warning(f"Could not read the IAM policy of GCS bucket {self.bucket.name}: {e}")
+            readable = False
+        
+        if not readable:
+            self.logger.error(
+                f"GCS bucket {self.bucket.name} does not grant allUsers objectViewer; "
+                f"serving signed URLs instead of public ones"
+            )
+            return "signed"
+        return url_mode
+    
+    def _object_url(self, blob: storage.Blob) -> str:
+        """URL other services fetch an uploaded object from
+        
+        Only "acl" mode makes an API call, to mark the object publicly readable.
+        """
+        
+        if self.url_mode == "signed":
+            return blob.generate_signed_url(
+                version="v4",
+                expiration=timedelta(seconds=self.settings.storage.signed_url_ttl),
+                method="GET"
+            )
+        if self.url_mode == "acl":
+            blob.make_public()
+        return blob.public_url
+    
+    def organize_project_assets(self, project_id: str) -> Mapping[str, str]:
         """Create organized folder structure for project assets"""
         
-        folders = {
-            "audio": f"projects/{project_id}/audio/",
-            "images": f"projects/{project_id}/images/",
-            "videos": f"projects/{project_id}/videos/",
-            "music": f"projects/{project_id}/music/",
-            "characters": f"projects/{project_id}/characters/",
-            "final": f"projects/{project_id}/final/",
-            "temp": f"projects/{project_id}/temp/"
-        }
-        
-        return folders
+        return _folders_for(project_id)
     
     def store_character_reference(self, character_name: str, image_source: Union[str, Path], project_id: str) -> str:
         """Store character reference image in organized structure
@@ -137,15 +299,9 @@ class MediaManager:
         folders = self.organize_project_assets(project_id)
         
         # Determine file extension based on asset type
-        if asset_type == "videos":
-            extension = ".mp4"
-        elif asset_type == "images":
-            extension = ".jpg"
-        elif asset_type == "music":
-            extension = ".mp3"
-        elif asset_type == "final":
-            extension = ".mp4"
-        else:
+        extension = self._EXTENSIONS.get(asset_type)
+        if extension is None:
+            self.logger.warning(f"Unknown asset type {asset_type!r}, storing as .file")
             extension = ".file"
         
         remote_path = folders[asset_type] + f"{scene_id}{extension}"
@@ -0,0 +1,34 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+# Absolute time.monotonic() deadline for the current task, if any
+_DEADLINE: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline(total_seconds: float) -> Iterator[None]:
+    """Bound everything inside the block (including retries) to ``total_seconds``
+    
+    Nested deadlines can only shorten the budget, never extend it. The value
+    lives in a context variable, so it follows ``asyncio.to_thread`` calls.
+    """
+    
+    expires_at = time.monotonic() + total_seconds
+    current = _DEADLINE.get()
+    if current is not None:
+        expires_at = min(expires_at, current)
+    
+    token = _DEADLINE.set(expires_at)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the current deadline, or None when unbounded"""
+    
+    expires_at = _DEADLINE.get()
+    if expires_at is None:
+        return None
+    return max(0.0, expires_at - time.monotonic())
@@ -1,60 +1,128 @@
 import hashlib
-import json
+import itertools
+import orjson
+import random
 import time
 import asyncio
-from functools import wraps
-from typing import Any, Dict, Callable, List
+from functools import lru_cache, wraps
+from typing import Any, Dict, Callable, List, Union
 import requests
 from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-def retry_with_backoff(max_retries: int = 3, backoff_factor: float = 1.0):
-    """Decorator for retrying functions with exponential backoff"""
+from utils.deadline import remaining_budget
+from utils.reliability import is_transient_error
+
+# Streamed downloads: 1 MiB chunks keep per-chunk Python overhead low on video
+# bodies; (connect, read) timeouts stop a stalled server from hanging a worker
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+DOWNLOAD_TIMEOUT = (5, 60)
+
+def retry_with_backoff(max_retries: int = 3, backoff_factor: float = 1.0, max_backoff: float = 30.0):
+    """Decorator for retrying transient failures with jittered exponential backoff
+    
+    Works on both plain functions and coroutine functions.
+    """
+    
+    def backoff_for(attempt: int, error: Exception) -> float:
+        """Delay before the next attempt, re-raising when no retry should happen"""
+        
+        if attempt >= max_retries - 1 or not is_transient_error(error):
+            raise error
+        
+        # Jitter keeps parallel callers from retrying in lockstep after a 429;
+        # the floor stops a near-zero draw from hammering a struggling service
+        wait_time = min(max_backoff, random.uniform(backoff_factor, backoff_factor * 3 * (2 ** attempt)))
+        
+        # Give up rather than start an attempt the caller's deadline can't cover
+        budget = remaining_budget()
+        if budget is not None and budget <= wait_time:
+            raise error
+        
+        return wait_time
     
     def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                # backoff_for re-raises on the last attempt, so the loop never falls through
+                for attempt in itertools.count():
+                    try:
+                        return await func(*args, **kwargs)
+                    except Exception as e:
+                        await asyncio.sleep(backoff_for(attempt, e))
+            return async_wrapper
+        
         @wraps(func)
         def wrapper(*args, **kwargs):
-            for attempt in range(max_retries):
+            for attempt in itertools.count():
                 try:
                     return func(*args, **kwargs)
                 except Exception as e:
-                    if attempt == max_retries - 1:
-                        raise e
-                    
-                    wait_time = backoff_factor * (2 ** attempt)
-                    time.sleep(wait_time)
-                    
-            return None
+                    time.sleep(backoff_for(attempt, e))
         return wrapper
     return decorator
 
-def generate_hash(content: str) -> str:
-    """Generate MD5 hash for content caching"""
-    return hashlib.md5(content.encode()).hexdigest()
+def generate_hash(content: Union[str, bytes]) -> str:
+    """Generate BLAKE2b hash for content caching"""
+    if isinstance(content, str):
+        content = content.encode()
+    return hashlib.blake2b(content, digest_size=32).hexdigest()
+
+def generate_file_hash(filepath: Path) -> str:
+    """Generate BLAKE2b hash of a file's contents, streamed in C by file_digest"""
+    with open(filepath, 'rb') as f:
+        return hashlib.file_digest(f, lambda: hashlib.blake2b(digest_size=32)).hexdigest()
 
 def save_json(data: Dict[Any, Any], filepath: Path) -> None:
-    """Save data as JSON file"""
+    """Save data as JSON file (numpy arrays and scalars included)"""
     filepath.parent.mkdir(parents=True, exist_ok=True)
-    with open(filepath, 'w') as f:
-        json.dump(data, f, indent=2)
+    filepath.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
 
 def load_json(filepath: Path) -> Dict[Any, Any]:
     """Load JSON file"""
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    return orjson.loads(filepath.read_bytes())
+
+@lru_cache(maxsize=1)
+def shared_session() -> requests.Session:
+    """Process-wide keep-alive session, so concurrent downloads reuse warm connections
+    
+    Transient statuses are retried by urllib3 before the body is read, so a
+    retry never restarts a partially consumed download.
+    """
+    session = requests.Session()
+    retries = Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD"]
+    )
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=32, max_retries=retries)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 def download_file(url: str, filepath: Path) -> Path:
     """Download file from URL"""
     filepath.parent.mkdir(parents=True, exist_ok=True)
     
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
-    with open(filepath, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    with shared_session().get(url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        response.raise_for_status()
+        
+        with open(filepath, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                f.write(chunk)
     
     return filepath
 
+def to_records(columns: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Expand column arrays (struct-of-arrays) into a list of row dicts"""
+    
+    names = list(columns)
+    rows = zip(*(columns[name].tolist() for name in names))
+    return [dict(zip(names, row)) for row in rows]
+
 def create_character_reference_prompt(characters: List[Dict], scene_description: str) -> str:
     """Create prompt with character references for scene generation"""
     
@@ -1,14 +1,66 @@
+import atexit
 import logging
+import queue
 import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
 from datetime import datetime
+from typing import Dict, Optional
+
+# All loggers enqueue records here; one background thread formats and writes them
+_LOG_QUEUE: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+_LISTENER: Optional[QueueListener] = None
+_LISTENER_LOCK = threading.Lock()
+
+# Loggers already wired to the queue, by name
+_LOGGERS: Dict[str, logging.Logger] = {}
+
+def _start_listener() -> None:
+    """Start the shared console/file writer thread on first use"""
+    
+    global _LISTENER
+    with _LISTENER_LOCK:
+        if _LISTENER is not None:
+            return
+        
+        # Create logs directory
+        logs_dir = Path("logs")
+        logs_dir.mkdir(exist_ok=True)
+        
+        # Create formatters
+        formatter = logging.Formatter(
+            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        )
+        
+        # Console handler
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        
+        # File handler
+        log_file = logs_dir / f"ai_video_director_{datetime.now().strftime('%Y%m%d')}.log"
+        file_handler = logging.FileHandler(log_file)
+        file_handler.setFormatter(formatter)
+        
+        _LISTENER = QueueListener(_LOG_QUEUE, console_handler, file_handler, respect_handler_level=True)
+        _LISTENER.start()
+        
+        # Drain anything still queued before the interpreter exits
+        atexit.register(_LISTENER.stop)
 
 def setup_logger(name: str = "ai_video_director", level: int = logging.INFO) -> logging.Logger:
-    """Setup logger with file and console output"""
+    """Setup logger with file and console output
+    
+    Records are handed to a background thread, so logging never blocks the
+    caller on console or disk I/O.
+    """
     
-    # Create logs directory
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
+    logger = _LOGGERS.get(name)
+    if logger is not None:
+        logger.setLevel(level)
+        return logger
+    
+    _start_listener()
     
     # Create logger
     logger = logging.getLogger(name)
@@ -16,23 +68,7 @@ def setup_logger(name: str = "ai_video_director", level: int = logging.INFO) ->
     
     # Clear existing handlers
     logger.handlers.clear()
+    logger.addHandler(QueueHandler(_LOG_QUEUE))
     
-    # Create formatters
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
-    
-    # File handler
-    log_file = logs_dir / f"ai_video_director_{datetime.now().strftime('%Y%m%d')}.log"
-    file_handler = logging.FileHandler(log_file)
-    file_handler.setLevel(level)
-    file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
-    
-    return logger
\ No newline at end of file
+    _LOGGERS[name] = logger
+    return logger
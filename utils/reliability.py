@@ -0,0 +1,172 @@
+import threading
+import time
+import httpx
+import requests
+from functools import wraps
+from typing import Callable, Dict, Optional
+
+# HTTP statuses worth retrying besides 5xx
+_TRANSIENT_STATUS_CODES = {408, 425, 429}
+
+# Status-less failures worth retrying: timeouts and dropped connections
+_TRANSIENT_EXCEPTIONS = (
+    TimeoutError,
+    ConnectionError,
+    requests.Timeout,
+    requests.ConnectionError,
+    httpx.TimeoutException,
+    httpx.NetworkError,
+    httpx.RemoteProtocolError
+)
+
+# The groq/openai SDKs wrap those as APIConnectionError/APITimeoutError;
+# matched by name so this module doesn't import every client
+_TRANSIENT_ERROR_NAMES = {"APIConnectionError", "APITimeoutError"}
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its circuit is open"""
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """Best-effort HTTP status of an SDK/HTTP exception"""
+    
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None)
+        if isinstance(status, int):
+            return status
+    return None
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether an error is worth retrying (429/5xx/timeouts) or should surface immediately"""
+    
+    if isinstance(error, CircuitOpenError):
+        return False
+    
+    status = _status_code(error)
+    if status is not None:
+        return status in _TRANSIENT_STATUS_CODES or status >= 500
+    
+    # Anything else (programming errors, bad payloads, disk errors) is permanent
+    if isinstance(error, _TRANSIENT_EXCEPTIONS):
+        return True
+    return any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(error).__mro__)
+
+class CircuitBreaker:
+    """Per-backend circuit breaker (CLOSED -> OPEN -> HALF_OPEN -> CLOSED)
+    
+    Opens after ``failure_threshold`` consecutive transient failures and
+    rejects calls for ``reset_timeout`` seconds, then lets a single probe
+    call through. Client errors (4xx) do not count against the backend.
+    Usable as a context manager around one backend call.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+    
+    @property
+    def probing(self) -> bool:
+        """Whether the circuit is half-open, or open with its reset timeout elapsed"""
+        
+        if self.state == self.HALF_OPEN:
+            return True
+        return self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout
+    
+    def before_call(self) -> None:
+        """Reject the call if the circuit is open"""
+        
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError(f"Circuit '{self.name}' is open")
+                self.state = self.HALF_OPEN
+                self._probe_in_flight = False
+            
+            if self.state == self.HALF_OPEN:
+                if self._probe_in_flight:
+                    raise CircuitOpenError(f"Circuit '{self.name}' is half-open, probe in flight")
+                self._probe_in_flight = True
+    
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self, error: BaseException) -> None:
+        if not is_transient_error(error):
+            # The backend answered; the request itself was bad
+            self.record_success()
+            return
+        
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def __enter__(self) -> "CircuitBreaker":
+        self.before_call()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc is None:
+            self.record_success()
+        else:
+            self.record_failure(exc)
+        return False
+
+_circuits: Dict[str, CircuitBreaker] = {}
+_bulkheads: Dict[str, threading.BoundedSemaphore] = {}
+_registry_lock = threading.Lock()
+
+def get_circuit(name: str) -> CircuitBreaker:
+    """Process-wide circuit breaker for a backend"""
+    
+    with _registry_lock:
+        if name not in _circuits:
+            _circuits[name] = CircuitBreaker(name)
+        return _circuits[name]
+
+def get_bulkhead(name: str, max_inflight: int = 8) -> threading.BoundedSemaphore:
+    """Process-wide semaphore capping in-flight calls to a provider
+    
+    ``max_inflight`` only applies the first time a bulkhead is created.
+    """
+    
+    with _registry_lock:
+        if name not in _bulkheads:
+            _bulkheads[name] = threading.BoundedSemaphore(max_inflight)
+        return _bulkheads[name]
+
+def with_circuit(name: str):
+    """Decorator guarding a function with the named circuit breaker"""
+    
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_circuit(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def with_bulkhead(name: str, max_inflight: int = 8):
+    """Decorator limiting concurrent calls through the named bulkhead"""
+    
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with get_bulkhead(name, max_inflight):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator